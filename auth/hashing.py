@@ -0,0 +1,113 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# "thread" is enough to use several cores because bcrypt releases the GIL;
+# "process" isolates hashing completely at the cost of one process per slot.
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_CONCURRENCY = int(
+    os.getenv("PASSWORD_HASH_CONCURRENCY", str(os.cpu_count() or 1))
+)
+
+# Pinning the rounds makes verify_and_update flag hashes made at any other
+# cost, so changing BCRYPT_ROUNDS rehashes users as they log in.
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS
+)
+
+_executor: Optional[Executor] = None
+_semaphore = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+_stats = {"queued": 0, "running": 0, "completed": 0, "max_queued": 0}
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception:
+        return False, None
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_CONCURRENCY,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_HASH_CONCURRENCY,
+                thread_name_prefix="password-hash",
+            )
+    return _executor
+
+
+def _forget_inherited_executor():
+    # The pool's threads (or processes) stay with the parent after a fork.
+    global _executor
+    _executor = None
+
+
+os.register_at_fork(after_in_child=_forget_inherited_executor)
+
+
+async def _run(func, *args):
+    """Run ``func`` on the hashing pool, at most PASSWORD_HASH_CONCURRENCY at once."""
+    _stats["queued"] += 1
+    _stats["max_queued"] = max(_stats["max_queued"], _stats["queued"])
+    try:
+        await _semaphore.acquire()
+    finally:
+        _stats["queued"] -= 1
+    _stats["running"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+    finally:
+        _stats["running"] -= 1
+        _stats["completed"] += 1
+        _semaphore.release()
+
+
+async def get_password_hash(password: str) -> str:
+    return await _run(_hash, password)
+
+
+async def verify_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """Check a password, returning ``(valid, new_hash)``.
+
+    ``new_hash`` is set when the stored hash was made with a different
+    bcrypt cost than BCRYPT_ROUNDS and should replace it.
+    """
+    return await _run(_verify_and_update, plain_password, hashed_password)
+
+
+def get_hashing_stats() -> dict:
+    return {
+        "executor": PASSWORD_HASH_EXECUTOR,
+        "concurrency": PASSWORD_HASH_CONCURRENCY,
+        "rounds": BCRYPT_ROUNDS,
+        **_stats,
+    }
+
+
+def shutdown_hashing():
+    """Stop the hashing pool; called from the app lifespan."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
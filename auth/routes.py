@@ -3,19 +3,29 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import jwt
-import psycopg2
+import psycopg
 import redis
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from passlib.context import CryptContext
-from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
-from sqlalchemy.orm import Session
+from psycopg import sql
 
+from auth.hashing import get_password_hash, verify_password
 from auth.models import Token, UserCreate, UserResponse
+from auth.sessions import (
+    cache_profile,
+    delete_session,
+    get_session,
+    new_jti,
+    store_session,
+)
 from common.auth_utils import verify_token
-from common.database import DatabaseConnection, RedisConnection
+from common.database import (
+    DatabaseConnection,
+    RedisConnection,
+    get_postgresql_db,
+    postgresql_connection,
+)
 
 load_dotenv()
 auth = APIRouter()
@@ -29,21 +39,9 @@ SECRET_KEY = "1e9356e2ef00d712c017be0e7f5e8ae5da1fa4f60522cc35638148566f0932f9"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception:
-        return False
-
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (
@@ -63,9 +61,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         )
 
 
-def get_user_from_db(email: str, db: Session) -> Optional[UserResponse]:
+async def get_user_from_db(
+    email: str, db_conn: DatabaseConnection
+) -> Optional[UserResponse]:
     try:
-        db_conn = DatabaseConnection()
         query = sql.SQL(
             """
             SELECT u.user_id, u.username, u.email, r.role_name 
@@ -74,13 +73,18 @@ def get_user_from_db(email: str, db: Session) -> Optional[UserResponse]:
             WHERE u.email = %s
         """
         )
-        db_conn.cursor.execute(query, (email,))
-        user = db_conn.cursor.fetchone()
+        await db_conn.cursor.execute(query, (email,))
+        user = await db_conn.cursor.fetchone()
 
         if user:
-            return UserResponse(id=user[0], name=user[1], email=user[2], role=user[3])
+            return UserResponse(
+                id=user["user_id"],
+                name=user["username"],
+                email=user["email"],
+                role=user["role_name"],
+            )
         return None
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         print(f"Database query failed: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -89,32 +93,33 @@ def get_user_from_db(email: str, db: Session) -> Optional[UserResponse]:
 
 
 @auth.post("/register", response_model=UserResponse)
-async def register_user(user: UserCreate):
+async def register_user(
+    user: UserCreate, db_conn: DatabaseConnection = Depends(get_postgresql_db)
+):
     try:
         user.validate_role()
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    existing_user = get_user_from_db(user.email, "users")
+    existing_user = await get_user_from_db(user.email, db_conn)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
 
-    db_conn = DatabaseConnection()
     try:
         # Get the role_id corresponding to the role_name
         query = sql.SQL("SELECT role_id FROM roles WHERE role_name = %s")
-        db_conn.cursor.execute(query, (user.role,))
-        role = db_conn.cursor.fetchone()
+        await db_conn.cursor.execute(query, (user.role,))
+        role = await db_conn.cursor.fetchone()
 
         if not role:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid role"
             )
 
-        role_id = role[0]
-        hashed_password = get_password_hash(user.password)
+        role_id = role["role_id"]
+        hashed_password = await get_password_hash(user.password)
 
         query = sql.SQL(
             """
@@ -123,53 +128,88 @@ async def register_user(user: UserCreate):
             RETURNING user_id, username, email, role_id
         """
         )
-        db_conn.cursor.execute(query, (user.name, user.email, role_id, hashed_password))
-        new_user_data = db_conn.cursor.fetchone()
-        db_conn.connection.commit()
+        await db_conn.cursor.execute(
+            query, (user.name, user.email, role_id, hashed_password)
+        )
+        new_user_data = await db_conn.cursor.fetchone()
+        await db_conn.connection.commit()
 
         return UserResponse(
-            id=new_user_data[0],
-            name=new_user_data[1],
-            email=new_user_data[2],
+            id=new_user_data["user_id"],
+            name=new_user_data["username"],
+            email=new_user_data["email"],
             role=user.role,
         )
-    except psycopg2.Error as e:
-        db_conn.connection.rollback()
+    except psycopg.Error as e:
+        await db_conn.connection.rollback()
         print(f"User registration failed: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to register user",
         )
-    # finally:
-    #     db_conn.close()
 
 
 @auth.post("/login", response_model=Token)
-async def login_user(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_user(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db_conn: DatabaseConnection = Depends(get_postgresql_db),
+):
     try:
-        db_conn = DatabaseConnection()
         redis_client = RedisConnection().connection
-        query = sql.SQL("SELECT user_id, password_hash FROM users WHERE email = %s")
-        db_conn.cursor = db_conn.connection.cursor(cursor_factory=RealDictCursor)
-        db_conn.cursor.execute(query, (form_data.username,))
-        user_data = db_conn.cursor.fetchone()
-
-        if not user_data or not verify_password(
-            form_data.password, user_data.get("password_hash")
-        ):
+        query = sql.SQL(
+            """
+            SELECT u.user_id, u.username, u.email, u.password_hash, r.role_name
+            FROM users u
+            JOIN roles r ON u.role_id = r.role_id
+            WHERE u.email = %s
+        """
+        )
+        await db_conn.cursor.execute(query, (form_data.username,))
+        user_data = await db_conn.cursor.fetchone()
+
+        valid, new_hash = False, None
+        if user_data:
+            valid, new_hash = await verify_password(
+                form_data.password, user_data.get("password_hash")
+            )
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        if new_hash:
+            # The stored hash predates the current BCRYPT_ROUNDS; upgrade it.
+            query = sql.SQL("UPDATE users SET password_hash = %s WHERE user_id = %s")
+            await db_conn.cursor.execute(query, (new_hash, user_data.get("user_id")))
+            await db_conn.connection.commit()
+        # The jti names this device's session; logging in elsewhere adds one.
+        jti = new_jti()
         access_token = create_access_token(
-            data={"email": form_data.username, "user_id": user_data.get("user_id")},
+            data={
+                "email": form_data.username,
+                "user_id": user_data.get("user_id"),
+                "jti": jti,
+                # Checked by require_admin without a lookup.
+                "role": user_data["role_name"],
+            },
         )
 
-        # Store token in Redis with error handling
+        profile = UserResponse(
+            id=user_data["user_id"],
+            name=user_data["username"],
+            email=user_data["email"],
+            role=user_data["role_name"],
+        )
+
+        # Store token and profile in Redis with error handling
         try:
-            redis_client.set(
-                form_data.username, access_token, ex=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            await store_session(
+                redis_client,
+                form_data.username,
+                jti,
+                profile,
+                ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             )
         except redis.RedisError as e:
             print(f"Redis operation failed: {e}")
@@ -179,28 +219,26 @@ async def login_user(form_data: OAuth2PasswordRequestForm = Depends()):
             )
 
         return {"access_token": access_token, "token_type": "bearer"}
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         print(f"Database query failed: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Database error occurred",
         )
-    # finally:
-    #     db_conn.close()
 
 
-@auth.post("/logout")
-async def logout_user(token_payload: str = Depends(verify_token)):
+async def _end_sessions(token_payload: dict, everywhere: bool):
     try:
         redis_client = RedisConnection().connection
         email = token_payload.get("email")
-        if not email:
+        jti = token_payload.get("jti")
+        if not email or not (jti or everywhere):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
             )
 
         try:
-            redis_client.delete(email)
+            await delete_session(redis_client, email, None if everywhere else jti)
         except redis.RedisError as e:
             print(f"Redis operation failed: {e}")
             raise HTTPException(
@@ -219,20 +257,37 @@ async def logout_user(token_payload: str = Depends(verify_token)):
         )
 
 
+@auth.post("/logout")
+async def logout_user(token_payload: dict = Depends(verify_token)):
+    """Sign out the device this token belongs to."""
+    return await _end_sessions(token_payload, everywhere=False)
+
+
+@auth.post("/logout:all")
+async def logout_everywhere(token_payload: dict = Depends(verify_token)):
+    """Sign out every device of the token's user."""
+    return await _end_sessions(token_payload, everywhere=True)
+
+
 @auth.get("/me", response_model=UserResponse)
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """Check the token's session and return the profile from one Redis read.
+
+    Postgres is only queried when the session's cached profile is missing.
+    """
     try:
         redis_client = RedisConnection().connection
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        if not email:
+        email = payload.get("email")
+        jti = payload.get("jti")
+        if not email or not jti:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
             )
 
         try:
-            token_in_redis = redis_client.get(email)
-            if not token_in_redis or token_in_redis != token:
+            active, profile = await get_session(redis_client, email, jti)
+            if not active:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid session"
                 )
@@ -243,12 +298,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
                 detail="Session management error",
             )
 
-        user = get_user_from_db(email, None)
+        if profile:
+            return profile
+
+        async with postgresql_connection() as db_conn:
+            user = await get_user_from_db(email, db_conn)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
 
+        try:
+            await cache_profile(
+                redis_client, email, user, ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            )
+        except redis.RedisError as e:
+            print(f"Redis operation failed: {e}")
+
         return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(
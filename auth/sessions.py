@@ -0,0 +1,82 @@
+import secrets
+import time
+from typing import Optional
+
+from auth.models import UserResponse
+
+# All of a user's sessions live in one Redis hash: a field per signed-in
+# device, keyed by the token's jti and holding its expiry (epoch seconds),
+# next to a cached copy of the profile. GET /auth/me then checks its jti and
+# reads the profile with a single HMGET. A hash this small is stored as a
+# listpack, a few dozen bytes per device, and the key lives as long as its
+# longest session.
+PROFILE_FIELDS = ("id", "name", "email", "role")
+
+
+def session_key(email: str) -> str:
+    return f"session:{email}"
+
+
+def new_jti() -> str:
+    """A random token id; 16 characters, never equal to a profile field."""
+    return secrets.token_urlsafe(12)
+
+
+async def store_session(
+    redis_client, email: str, jti: str, profile: UserResponse, ttl: int
+):
+    """Add the session ``jti`` for ``ttl`` seconds and refresh the profile.
+
+    The user's other sessions stay signed in; expired ones are removed.
+    """
+    key = session_key(email)
+    now = int(time.time())
+    sessions = await redis_client.hgetall(key)
+    expired = [
+        field
+        for field, expires_at in sessions.items()
+        if field not in PROFILE_FIELDS and int(expires_at) <= now
+    ]
+    async with redis_client.pipeline(transaction=True) as pipe:
+        if expired:
+            pipe.hdel(key, *expired)
+        pipe.hset(key, mapping={jti: now + ttl, **profile.model_dump()})
+        # NX gives a new key its TTL; GT only ever extends it.
+        pipe.expire(key, ttl, nx=True)
+        pipe.expire(key, ttl, gt=True)
+        await pipe.execute()
+
+
+async def get_session(redis_client, email: str, jti: str) -> tuple[bool, dict]:
+    """Return ``(active, profile)``; profile is {} when not cached."""
+    expires_at, *values = await redis_client.hmget(
+        session_key(email), jti, *PROFILE_FIELDS
+    )
+    active = expires_at is not None and int(expires_at) > time.time()
+    if any(value is None for value in values):
+        return active, {}
+    return active, dict(zip(PROFILE_FIELDS, values))
+
+
+async def cache_profile(redis_client, email: str, profile: UserResponse, ttl: int):
+    """Refill the profile fields of an existing session after a cache miss."""
+    key = session_key(email)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping=profile.model_dump())
+        # If the session expired meanwhile, HSET recreated the key without
+        # a TTL; never leave it around longer than a session would live.
+        pipe.expire(key, ttl, nx=True)
+        await pipe.execute()
+
+
+async def invalidate_profile(redis_client, email: str):
+    """Drop the cached profile, keeping the sessions; call after profile edits."""
+    await redis_client.hdel(session_key(email), *PROFILE_FIELDS)
+
+
+async def delete_session(redis_client, email: str, jti: Optional[str] = None):
+    """Sign out the session ``jti``, or every session of the user without it."""
+    if jti is None:
+        await redis_client.delete(session_key(email))
+    else:
+        await redis_client.hdel(session_key(email), jti)
@@ -0,0 +1,112 @@
+"""Helpers shared by the benchmark scripts.
+
+Import this before anything that imports the app: it gives SECRET_KEY a
+default, so the tokens made here pass verify_token without a .env file.
+"""
+
+import asyncio
+import contextlib
+import inspect
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-at-least-32-bytes")
+
+import jwt  # noqa: E402
+
+from common import auth_utils  # noqa: E402
+from common.database import (  # noqa: E402
+    MongoDBConnection,
+    PostgresPool,
+    RedisConnection,
+    postgresql_connection,
+)
+
+
+def percentile(latencies: list, p: float) -> float:
+    """Nearest-rank percentile of sorted ``latencies``, in milliseconds."""
+    index = min(len(latencies) - 1, max(0, math.ceil(p / 100 * len(latencies)) - 1))
+    return round(latencies[index] * 1000, 3)
+
+
+def make_token(email: str, user_id, **claims) -> str:
+    """A two-hour token that verify_token accepts, with any extra ``claims``."""
+    payload = {
+        "email": email,
+        "user_id": user_id,
+        **claims,
+        "exp": datetime.now(timezone.utc) + timedelta(hours=2),
+        "iat": datetime.now(timezone.utc),
+    }
+    return jwt.encode(payload, auth_utils.SECRET_KEY, algorithm=auth_utils.ALGORITHM)
+
+
+def use_stand_ins():
+    """Back Redis and MongoDB with fakeredis and mongomock, in memory.
+
+    Call before the app's lifespan starts; the connection singletons keep
+    these clients instead of connecting to the configured servers.
+    """
+    from fakeredis import FakeAsyncRedis
+    from mongomock_motor import AsyncMongoMockClient
+
+    MongoDBConnection(AsyncMongoMockClient("mongodb://localhost/not_decided"))
+    RedisConnection(FakeAsyncRedis(decode_responses=True))
+
+
+@contextlib.asynccontextmanager
+async def open_postgres():
+    """Open the PostgreSQL pool for the block, as the lifespan would."""
+    postgres_pool = PostgresPool()
+    await postgres_pool.open()
+    try:
+        yield postgres_pool
+    finally:
+        await postgres_pool.close()
+
+
+@contextlib.asynccontextmanager
+async def open_redis():
+    """Connect Redis for the block and yield the client."""
+    redis_conn = RedisConnection()
+    await redis_conn.connect()
+    try:
+        yield redis_conn.connection
+    finally:
+        await redis_conn.close()
+
+
+async def delete_tagged_events(tag: str):
+    """Remove the events a benchmark seeded, named ``tag`` plus a suffix."""
+    async with postgresql_connection() as db_conn:
+        await db_conn.cursor.execute(
+            "DELETE FROM events WHERE event_name LIKE %s;", (f"{tag}%",)
+        )
+
+
+async def unlink_matching(redis_client, pattern: str, batch: int = 1000):
+    """Unlink every key matching ``pattern``, ``batch`` keys at a time."""
+    keys = []
+    async for key in redis_client.scan_iter(match=pattern, count=batch):
+        keys.append(key)
+        if len(keys) == batch:
+            await redis_client.unlink(*keys)
+            keys = []
+    if keys:
+        await redis_client.unlink(*keys)
+
+
+def run_quietly(func: Callable, *args):
+    """Call ``func(*args)`` with stdout sent to stderr and return its result.
+
+    The app logs with print(); this keeps stdout for the JSON report alone.
+    Coroutines are run to completion with asyncio.run.
+    """
+    with contextlib.redirect_stdout(sys.stderr):
+        result = func(*args)
+        if inspect.iscoroutine(result):
+            result = asyncio.run(result)
+    return result
@@ -0,0 +1,58 @@
+"""Per-request cost of the verify_token dependency.
+
+Compares a full ``jwt.decode`` (what every authenticated request paid
+before) with ``verify_token`` served from the verified-token cache, and
+reports microseconds per call.
+
+    python -m benchmarks.auth_overhead --iterations 100000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import jwt
+
+from benchmarks._common import make_token
+from common import auth_utils
+
+
+def bench_decode(token: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        jwt.decode(token, auth_utils.SECRET_KEY, algorithms=[auth_utils.ALGORITHM])
+    return time.perf_counter() - start
+
+
+async def bench_cached(token: str, iterations: int) -> float:
+    await auth_utils.verify_token(token)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await auth_utils.verify_token(token)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    token = make_token("bench@example.com", 1)
+    decode = bench_decode(token, args.iterations)
+    cached = asyncio.run(bench_cached(token, args.iterations))
+    print(
+        json.dumps(
+            {
+                "iterations": args.iterations,
+                "jwt_decode_us": round(decode / args.iterations * 1e6, 3),
+                "verify_token_cached_us": round(cached / args.iterations * 1e6, 3),
+                "speedup": round(decode / cached, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Concurrent-request throughput of the blocking vs async PostgreSQL paths.
+
+Runs ``--concurrency`` simulated requests at a time on one event loop, each
+executing the ``read_events`` query (optionally preceded by a ``pg_sleep`` to
+stand in for a slow query). ``blocking`` reproduces the old handlers, which
+called a synchronous driver from ``async def``; ``async`` goes through the
+pooled ``get_postgresql_db`` dependency the routes use now.
+
+    python -m benchmarks.db_concurrency --concurrency 50 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import psycopg
+
+from benchmarks._common import percentile
+from common.database import DATABASE_URL, PostgresPool, get_postgresql_db
+
+READ_EVENTS = """SELECT event_id, event_name, description, location, start_time, end_time, event_date, organizer_id, created_at, updated_at
+                 FROM events
+                 LIMIT %s OFFSET %s;"""
+
+
+async def run(handler, concurrency: int, requests: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request():
+        async with semaphore:
+            start = time.perf_counter()
+            await handler()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def bench_blocking(args) -> dict:
+    connection = psycopg.connect(DATABASE_URL)
+    cursor = connection.cursor()
+
+    async def handler():
+        if args.sleep:
+            cursor.execute("SELECT pg_sleep(%s)", (args.sleep,))
+        cursor.execute(READ_EVENTS, (10, 0))
+        cursor.fetchall()
+
+    try:
+        return await run(handler, args.concurrency, args.requests)
+    finally:
+        connection.close()
+
+
+async def bench_async(args) -> dict:
+    postgres_pool = PostgresPool()
+    await postgres_pool.open()
+
+    async def handler():
+        async for db_conn in get_postgresql_db():
+            if args.sleep:
+                await db_conn.cursor.execute("SELECT pg_sleep(%s)", (args.sleep,))
+            await db_conn.cursor.execute(READ_EVENTS, (10, 0))
+            await db_conn.cursor.fetchall()
+
+    try:
+        return await run(handler, args.concurrency, args.requests)
+    finally:
+        await postgres_pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument(
+        "--sleep", type=float, default=0.005, help="seconds of pg_sleep per request"
+    )
+    args = parser.parse_args()
+
+    results = {
+        "blocking": asyncio.run(bench_blocking(args)),
+        "async": asyncio.run(bench_async(args)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
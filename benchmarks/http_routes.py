@@ -0,0 +1,555 @@
+"""Latency and throughput of every auth, event and ticket route, as JSON.
+
+Boots ``main:app`` in process (lifespan included) and drives it through
+httpx's ASGI transport, so the numbers cover routing, validation, handlers
+and the databases, but not sockets or the uvicorn worker. Each route runs
+``--requests`` times at ``--concurrency`` (bcrypt and admin routes run a
+tenth of that) against seeded data, and the report gives p50/p95/p99
+latency and requests per second per route.
+
+Data, request counts and the order of routes are fixed by the arguments,
+so two runs with the same arguments on the same machine are comparable;
+pass an earlier report as ``--baseline`` to fail on p95 regressions.
+Routes that answer any 4xx/5xx, or that have nothing to run, are listed
+under ``failed``, left out of the comparison, and make the run exit 1.
+
+    python -m benchmarks.http_routes --output before.json
+    python -m benchmarks.http_routes --baseline before.json --max-regression 0.2
+    python -m benchmarks.http_routes --stand-ins  # fakeredis + mongomock
+
+PostgreSQL must already have the schema; Redis and MongoDB can be replaced
+by in-memory stand-ins with ``--stand-ins`` (the summary rebuild route is
+skipped there because mongomock has no ``$merge``). Seeded rows are tagged
+``bench-`` and removed again unless ``--keep-data`` is given.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from auth.hashing import get_password_hash
+from auth.sessions import new_jti
+from benchmarks._common import make_token, percentile, run_quietly, use_stand_ins
+from common import cache
+from common.database import MongoDBConnection, RedisConnection, postgresql_connection
+from common.helpers import encode_cursor
+from main import app
+from tickets.inventory import inventory_key, pending_key
+
+TAG = "bench-"
+EMAIL_DOMAIN = "bench.notdecided.com"
+PASSWORD = "benchmark-password"
+EVENT = {
+    "event_name": f"{TAG}event",
+    "description": "Benchmark event",
+    "location": "Hall A",
+    "start_time": "18:00:00",
+    "end_time": "22:00:00",
+    "event_date": "2030-01-01T18:00:00Z",
+}
+REVIEW_COMMENT = "Benchmark review"
+TICKET = {"user_id": 1, "ticket_type": "General", "price": "25.00"}
+
+
+@dataclass
+class Route:
+    """One benchmarked route; ``request(i)`` builds the i-th request."""
+
+    name: str
+    request: Callable[[int], tuple]
+    requests: Optional[int] = None
+    warmup: bool = False
+    collect: Optional[Callable[[httpx.Response], None]] = None
+    prepare: Optional[Callable[[], Awaitable[None]]] = None
+
+
+@dataclass
+class State:
+    events: list = field(default_factory=list)
+    cursors: list = field(default_factory=list)
+    created_events: list = field(default_factory=list)
+    created_reviews: list = field(default_factory=list)
+    created_tickets: list = field(default_factory=list)
+    user_id: Optional[str] = None
+    user_email: str = ""
+    login_token: str = ""
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def cleanup():
+    async with postgresql_connection() as db_conn:
+        await db_conn.cursor.execute(
+            "SELECT event_id FROM events WHERE event_name LIKE %s", (f"{TAG}%",)
+        )
+        event_ids = [row["event_id"] for row in await db_conn.cursor.fetchall()]
+        await db_conn.cursor.execute(
+            "DELETE FROM tickets WHERE event_id = ANY(%s)", (event_ids,)
+        )
+        await db_conn.cursor.execute(
+            "DELETE FROM events WHERE event_id = ANY(%s)", (event_ids,)
+        )
+        await db_conn.cursor.execute(
+            "DELETE FROM users WHERE email LIKE %s", (f"%@{EMAIL_DOMAIN}",)
+        )
+    db = MongoDBConnection().db
+    await db.reviews.delete_many({"event_id": {"$in": event_ids}})
+    await db.review_summaries.delete_many({"_id": {"$in": event_ids}})
+    redis_client = RedisConnection().connection
+    if event_ids:
+        await redis_client.delete(
+            *(key for e in event_ids for key in (inventory_key(e), pending_key(e)))
+        )
+    await cache.invalidate_event()
+
+
+async def seed(args) -> State:
+    """Insert ``--events`` events with tickets and reviews, and one user."""
+    state = State()
+    async with postgresql_connection() as db_conn:
+        state.user_email = f"{TAG}user@{EMAIL_DOMAIN}"
+        await db_conn.cursor.execute(
+            """INSERT INTO users (username, email, role_id, password_hash)
+               SELECT %s, %s, role_id, %s FROM roles WHERE role_name = 'attendee'
+               RETURNING user_id;""",
+            ("bench", state.user_email, await get_password_hash(PASSWORD)),
+        )
+        state.user_id = (await db_conn.cursor.fetchone())["user_id"]
+
+        await db_conn.cursor.execute(
+            """INSERT INTO events (event_name, description, location, start_time, end_time, event_date, organizer_id)
+               SELECT %s || n::text, 'Seeded benchmark event', 'Hall ' || (n %% 20)::text,
+                      '18:00', '22:00', %s::timestamptz + n * interval '1 hour', %s
+               FROM generate_series(1, %s) AS n
+               RETURNING event_id, event_date;""",
+            (
+                TAG,
+                datetime(2030, 1, 1, tzinfo=timezone.utc),
+                state.user_id,
+                args.events,
+            ),
+        )
+        rows = await db_conn.cursor.fetchall()
+        rows.sort(key=lambda row: (row["event_date"], row["event_id"]))
+        state.events = [row["event_id"] for row in rows]
+        state.cursors = [
+            encode_cursor(row["event_date"], row["event_id"])
+            for row in rows[args.page_size - 1 :: args.page_size]
+        ]
+        await db_conn.cursor.execute(
+            """INSERT INTO tickets (event_id, user_id, ticket_type, price)
+               SELECT e.event_id, (n %% 1000) + 1, 'General', 25.00
+               FROM events e, generate_series(1, %s) AS n
+               WHERE e.event_id = ANY(%s);""",
+            (args.tickets_per_event, state.events),
+        )
+
+    now = datetime.now(timezone.utc)
+    reviews = [
+        {
+            "event_id": event_id,
+            "user_id": str((i % 1000) + 1),
+            "rating": (i % 5) + 1,
+            "comment": "Seeded benchmark review",
+            "created_at": now + timedelta(milliseconds=i),
+        }
+        for event_id in state.events
+        for i in range(args.reviews_per_event)
+    ]
+    if reviews:
+        await MongoDBConnection().db.reviews.insert_many(reviews)
+    return state
+
+
+def build_routes(args, state: State) -> list:
+    n, light = args.requests, max(1, args.requests // 10)
+    events = state.events
+
+    def pick(i):
+        return events[i % len(events)]
+
+    async def load_created_reviews():
+        # Review responses carry no id, so look up the ones created above.
+        reviews = MongoDBConnection().db.reviews.find(
+            {"event_id": {"$in": events}, "comment": REVIEW_COMMENT}, {"_id": 1}
+        )
+        state.created_reviews = [str(review["_id"]) async for review in reviews]
+
+    def created(items):
+        return lambda i: items[i % len(items)]
+
+    return [
+        Route(
+            "POST /auth/register",
+            lambda i: (
+                "POST",
+                "/auth/register",
+                {
+                    "json": {
+                        "name": "bench",
+                        "email": f"{TAG}{i}@{EMAIL_DOMAIN}",
+                        "role": "attendee",
+                        "password": PASSWORD,
+                    }
+                },
+            ),
+            requests=light,
+        ),
+        Route(
+            "POST /auth/login",
+            lambda i: (
+                "POST",
+                "/auth/login",
+                {"data": {"username": state.user_email, "password": PASSWORD}},
+            ),
+            requests=light,
+            collect=lambda r: setattr(state, "login_token", r.json()["access_token"]),
+        ),
+        Route(
+            "GET /auth/me",
+            lambda i: (
+                "GET",
+                "/auth/me",
+                {"headers": {"Authorization": f"Bearer {state.login_token}"}},
+            ),
+            warmup=True,
+        ),
+        Route(
+            "POST /event/",
+            lambda i: ("POST", "/event/", {"json": {**EVENT, "capacity": n}}),
+            collect=lambda r: state.created_events.append(r.json()["event_id"]),
+        ),
+        Route(
+            "GET /event/ (offset)",
+            lambda i: (
+                "GET",
+                "/event/",
+                {
+                    "params": {
+                        "skip": (i * args.page_size) % len(events),
+                        "limit": args.page_size,
+                    }
+                },
+            ),
+            warmup=True,
+        ),
+        Route(
+            "GET /event/ (cursor)",
+            lambda i: (
+                "GET",
+                "/event/",
+                {
+                    "params": {
+                        "cursor": state.cursors[i % len(state.cursors)],
+                        "limit": args.page_size,
+                    }
+                },
+            ),
+            warmup=True,
+        ),
+        Route(
+            "GET /event/{id}", lambda i: ("GET", f"/event/{pick(i)}", {}), warmup=True
+        ),
+        Route(
+            "GET /event/batch",
+            lambda i: (
+                "GET",
+                "/event/batch",
+                {"params": {"ids": ",".join(str(pick(i + k)) for k in range(20))}},
+            ),
+            warmup=True,
+        ),
+        Route(
+            "PUT /event/{id}",
+            lambda i: (
+                "PUT",
+                f"/event/{created(state.created_events)(i)}",
+                {"json": {**EVENT, "status": None}},
+            ),
+        ),
+        Route(
+            "POST /event/{id}/reviews",
+            lambda i: (
+                "POST",
+                f"/event/{pick(i)}/reviews",
+                {"json": {"rating": (i % 5) + 1, "comment": REVIEW_COMMENT}},
+            ),
+        ),
+        Route(
+            "GET /event/{id}/reviews",
+            lambda i: ("GET", f"/event/{pick(i)}/reviews", {}),
+            warmup=True,
+        ),
+        Route(
+            "GET /event/{id}/reviews/summary",
+            lambda i: ("GET", f"/event/{pick(i)}/reviews/summary", {}),
+            warmup=True,
+        ),
+        Route(
+            "POST /event/reviews/summaries:rebuild",
+            lambda i: (
+                "POST",
+                "/event/reviews/summaries:rebuild",
+                {"params": {"event_id": pick(i)}},
+            ),
+            requests=0 if args.stand_ins else light,
+        ),
+        Route(
+            "DELETE /event/reviews/{id}",
+            lambda i: ("DELETE", f"/event/reviews/{state.created_reviews[i]}", {}),
+            requests=-1,
+            prepare=load_created_reviews,
+        ),
+        Route(
+            "POST /tickets/events/{id}/tickets",
+            lambda i: (
+                "POST",
+                f"/tickets/events/{created(state.created_events)(i)}/tickets",
+                {"json": TICKET},
+            ),
+            collect=lambda r: state.created_tickets.append(r.json()["ticket_id"]),
+        ),
+        Route(
+            "POST /tickets/events/{id}/tickets:batch",
+            lambda i: (
+                "POST",
+                f"/tickets/events/{pick(i)}/tickets:batch",
+                {"json": [TICKET] * args.batch_size},
+            ),
+        ),
+        Route(
+            "GET /tickets/users/{id}/tickets",
+            lambda i: ("GET", f"/tickets/users/{(i % 1000) + 1}/tickets", {}),
+            warmup=True,
+        ),
+        Route(
+            "GET /tickets/events/{id}/tickets",
+            lambda i: ("GET", f"/tickets/events/{pick(i)}/tickets", {}),
+            warmup=True,
+        ),
+        Route(
+            "GET /tickets/events/{id}/tickets/export",
+            lambda i: (
+                "GET",
+                f"/tickets/events/{pick(i)}/tickets/export",
+                {"params": {"format": "csv" if i % 2 else "ndjson"}},
+            ),
+            warmup=True,
+        ),
+        Route(
+            "DELETE /tickets/tickets/{id}",
+            lambda i: ("DELETE", f"/tickets/tickets/{state.created_tickets[i]}", {}),
+            requests=-1,
+        ),
+        Route(
+            "POST /tickets/inventory:reconcile",
+            lambda i: ("POST", "/tickets/inventory:reconcile", {}),
+            requests=light,
+        ),
+        Route(
+            "DELETE /event/{id}",
+            lambda i: ("DELETE", f"/event/{state.created_events[i]}", {}),
+            requests=-1,
+        ),
+        Route("GET /stats", lambda i: ("GET", "/stats", {}), warmup=True),
+        # Uses the client's default token: login tokens are signed with
+        # auth.routes.SECRET_KEY, which verify_token does not accept. Its
+        # jti names no session, so each logout is the same delete.
+        Route(
+            "POST /auth/logout", lambda i: ("POST", "/auth/logout", {}), requests=light
+        ),
+    ]
+
+
+# DELETE routes (requests=-1) remove exactly what the matching POST created.
+CREATED_BY = {
+    "DELETE /event/reviews/{id}": "created_reviews",
+    "DELETE /tickets/tickets/{id}": "created_tickets",
+    "DELETE /event/{id}": "created_events",
+}
+
+
+async def run_route(client: httpx.AsyncClient, route: Route, total: int, args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, status_codes = [], {}
+
+    async def one_request(i: int, record: bool):
+        method, url, kwargs = route.request(i)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - start
+        if not record:
+            return
+        latencies.append(elapsed)
+        status_codes[response.status_code] = (
+            status_codes.get(response.status_code, 0) + 1
+        )
+        if route.collect and response.is_success:
+            route.collect(response)
+
+    if route.warmup:
+        await asyncio.gather(
+            *(one_request(i, False) for i in range(min(args.warmup, total)))
+        )
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(i, True) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    errors = sum(n for code, n in status_codes.items() if code >= 400)
+    return {
+        "requests": total,
+        "errors": errors,
+        "ok": errors == 0,
+        "status_codes": {str(code): n for code, n in sorted(status_codes.items())},
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+
+
+async def bench(args) -> dict:
+    if args.stand_ins:
+        use_stand_ins()
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        await cleanup()
+        state = await seed(args)
+        # The admin routes (rebuild, reconcile, advance) are measured too.
+        # No session is stored for its jti; logout still needs one to delete.
+        token = make_token(state.user_email, state.user_id, role="admin", jti=new_jti())
+        headers = {"Authorization": f"Bearer {token}"}
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        try:
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench", headers=headers
+            ) as client:
+                for route in build_routes(args, state):
+                    if route.prepare:
+                        await route.prepare()
+                    total = route.requests
+                    if total == 0:
+                        continue
+                    if total is None:
+                        total = args.requests
+                    elif total < 0:
+                        total = len(getattr(state, CREATED_BY[route.name]))
+                    if total == 0:
+                        # Its create route failed, so there is nothing to delete.
+                        results[route.name] = {"requests": 0, "errors": 0, "ok": False}
+                        print(f"{route.name}: nothing to run", file=sys.stderr)
+                        continue
+                    results[route.name] = await run_route(client, route, total, args)
+                    print(
+                        f"{route.name}: {results[route.name]['requests_per_second']} req/s,"
+                        f" {results[route.name]['errors']} errors",
+                        file=sys.stderr,
+                    )
+        finally:
+            if not args.keep_data:
+                await cleanup()
+    return results
+
+
+def failed(result: dict) -> bool:
+    """Whether a route answered any 4xx/5xx or did not run at all."""
+    return result["requests"] == 0 or result["errors"] > 0
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """Routes whose p95 grew by more than ``max_regression`` over the baseline.
+
+    Failed routes are left out on either side: an error answered fast would
+    otherwise read as a speed-up.
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("routes", {}).get(name)
+        if not before or failed(before) or failed(current):
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            regressions.append(
+                {"route": name, "baseline_p95_ms": before["p95_ms"], **current}
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--tickets-per-event", type=int, default=50)
+    parser.add_argument("--reviews-per-event", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument(
+        "--stand-ins", action="store_true", help="use fakeredis and mongomock"
+    )
+    parser.add_argument("--keep-data", action="store_true")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare p95 against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    routes = run_quietly(bench, args)
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": started_at,
+            "python": platform.python_version(),
+            "stand_ins": args.stand_ins,
+            "config": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("output", "baseline", "max_regression")
+            },
+        },
+        "routes": routes,
+        "failed": [name for name, result in routes.items() if failed(result)],
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("config") != report["meta"]["config"]:
+            print("warning: baseline was run with other arguments", file=sys.stderr)
+        report["regressions"] = compare(routes, baseline, args.max_regression)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if report["failed"]:
+        print(f"failed routes: {', '.join(report['failed'])}", file=sys.stderr)
+    if report["failed"] or report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
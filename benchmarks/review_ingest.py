@@ -0,0 +1,159 @@
+"""Review burst: accept latency and time until written, direct vs stream.
+
+Boots ``main:app`` in process and posts ``--reviews`` reviews at
+``--concurrency`` to one event, once per write mode:
+
+- ``direct``: each request inserts its review into MongoDB.
+- ``stream``: each request appends to the Redis stream and a consumer
+  drains it with insert_many (``REVIEW_INGEST_BATCH_SIZE`` /
+  ``REVIEW_INGEST_MAX_WAIT_MS`` apply).
+
+The report gives accept latency percentiles and requests per second, the
+seconds until every review was in MongoDB and counted in its summary, and
+for ``stream`` the peak backlog. Exits 1 if a mode lost or double-counted
+reviews. Needs real Redis and MongoDB (fakeredis ignores BLOCK); reviews
+are tagged ``bench-ingest-`` and removed afterwards.
+
+    python -m benchmarks.review_ingest --reviews 5000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+
+import event.routes as event_routes
+from benchmarks._common import percentile, run_quietly
+from common.auth_utils import verify_token
+from common.database import MongoDBConnection, RedisConnection
+from event.review_ingest import (
+    REVIEW_STREAM,
+    REVIEW_WRITE_MODE,
+    drain_review_stream,
+    ensure_review_stream,
+)
+from main import app
+
+TAG = "bench-ingest-"
+MODES = ("direct", "stream")
+
+
+async def cleanup(db):
+    await db.reviews.delete_many({"event_id": {"$regex": f"^{TAG}"}})
+    await db.review_summaries.delete_many({"_id": {"$regex": f"^{TAG}"}})
+
+
+async def written(db, event_id: str) -> tuple[int, int]:
+    summary = await db.review_summaries.find_one({"_id": event_id}) or {}
+    return await db.reviews.count_documents({"event_id": event_id}), summary.get(
+        "count", 0
+    )
+
+
+async def burst(client: httpx.AsyncClient, mode: str, args) -> dict:
+    db = MongoDBConnection().db
+    redis_client = RedisConnection().connection
+    event_id = f"{TAG}{mode}"
+    event_routes.REVIEW_WRITE_MODE = mode
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors = [], 0
+    peak_backlog = 0
+
+    async def one_review(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                f"/event/{event_id}/reviews",
+                json={"rating": 1 + i % 5, "comment": f"{TAG}{i}"},
+            )
+            latencies.append(time.perf_counter() - start)
+        if response.is_error:
+            errors += 1
+
+    async def sample_backlog():
+        nonlocal peak_backlog
+        while True:
+            peak_backlog = max(peak_backlog, await redis_client.xlen(REVIEW_STREAM))
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample_backlog()) if mode == "stream" else None
+    start = time.perf_counter()
+    await asyncio.gather(*(one_review(i) for i in range(args.reviews)))
+    accepted = time.perf_counter() - start
+    expected = args.reviews - errors
+    while await written(db, event_id) != (expected, expected):
+        if time.perf_counter() - start > args.timeout:
+            break
+        await asyncio.sleep(0.05)
+    done = time.perf_counter() - start
+    if sampler:
+        sampler.cancel()
+
+    reviews, summary_count = await written(db, event_id)
+    latencies.sort()
+    result = {
+        "reviews": args.reviews,
+        "errors": errors,
+        "accept_seconds": round(accepted, 4),
+        "accepted_per_second": round(args.reviews / accepted, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "written_after_seconds": round(done, 4),
+        "written_reviews": reviews,
+        "summary_count": summary_count,
+        "ok": reviews == summary_count == expected,
+    }
+    if mode == "stream":
+        result["peak_backlog"] = peak_backlog
+    return result
+
+
+async def bench(args) -> dict:
+    results = {}
+    # Reviews are what is measured; skip JWT verification.
+    app.dependency_overrides[verify_token] = lambda: {"user_id": f"{TAG}user"}
+    async with app.router.lifespan_context(app):
+        db = MongoDBConnection().db
+        await cleanup(db)
+        consumers = []
+        if REVIEW_WRITE_MODE != "stream":
+            # The lifespan only starts the consumer in stream mode.
+            await ensure_review_stream(RedisConnection().connection)
+            consumers.append(asyncio.create_task(drain_review_stream()))
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        try:
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench"
+            ) as client:
+                for mode in MODES:
+                    results[mode] = await burst(client, mode, args)
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            await cleanup(db)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--timeout", type=float, default=60, help="seconds to wait for the writes"
+    )
+    args = parser.parse_args()
+
+    results = run_quietly(bench, args)
+    print(json.dumps(results, indent=2))
+    if not all(result["ok"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
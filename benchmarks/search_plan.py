@@ -0,0 +1,135 @@
+"""Check that event search queries are planned on their indexes.
+
+Seeds ``--events`` tagged events (removed afterwards), ANALYZEs the table,
+then runs ``EXPLAIN (ANALYZE, FORMAT JSON)`` on the exact statements
+``GET /event/search`` builds. Prints the indexes each plan used and its
+execution time as JSON, and exits 1 if a plan missed its expected index.
+Run the migrations first.
+
+    python -m benchmarks.search_plan --events 50000
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+from psycopg import sql
+
+from benchmarks._common import delete_tagged_events, open_postgres, run_quietly
+from common.database import postgresql_connection
+from event.search import build_search_query
+
+TAG = "bench-search-"
+SEARCH_INDEX = "idx_events_search"
+DATE_INDEX = "idx_events_event_date_event_id"
+START = datetime(2031, 1, 1, tzinfo=timezone.utc)
+WORDS = [
+    "jazz",
+    "rock",
+    "comedy",
+    "startup",
+    "python",
+    "marathon",
+    "poetry",
+    "opera",
+    "chess",
+    "robotics",
+]
+CITIES = ["Berlin", "Lisbon", "Pune", "Austin", "Osaka", "Nairobi", "Lima"]
+
+# (name, search arguments, index the plan must use)
+CASES = [
+    ("text", {"q": "robotics Osaka"}, SEARCH_INDEX),
+    ("phrase", {"q": '"jazz night"'}, SEARCH_INDEX),
+    (
+        "date range",
+        {
+            "date_from": START + timedelta(days=30),
+            "date_to": START + timedelta(days=31),
+        },
+        DATE_INDEX,
+    ),
+    (
+        "text and date range",
+        {
+            "q": "chess",
+            "date_from": START + timedelta(days=10),
+            "date_to": START + timedelta(days=40),
+        },
+        SEARCH_INDEX,
+    ),
+]
+
+
+async def seed(events: int):
+    async with postgresql_connection() as db_conn:
+        await db_conn.cursor.execute(
+            """INSERT INTO events (event_name, description, location, start_time, end_time, event_date)
+               SELECT %s || (%s::text[])[1 + n %% 10] || ' night ' || n::text,
+                      'An evening of ' || (%s::text[])[1 + (n / 10) %% 10],
+                      (%s::text[])[1 + n %% 7],
+                      '18:00', '22:00', %s::timestamptz + n * interval '10 minutes'
+               FROM generate_series(1, %s) AS n;""",
+            (TAG, WORDS, WORDS, CITIES, START, events),
+        )
+        await db_conn.cursor.execute("ANALYZE events;")
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def explain(arguments: dict, limit: int) -> dict:
+    query, params = build_search_query(
+        arguments.get("q"),
+        arguments.get("date_from"),
+        arguments.get("date_to"),
+        None,
+        limit,
+        0,
+    )
+    async with postgresql_connection() as db_conn:
+        await db_conn.cursor.execute(
+            sql.SQL("EXPLAIN (ANALYZE, FORMAT JSON) ") + query, params
+        )
+        result = (await db_conn.cursor.fetchone())["QUERY PLAN"][0]
+    nodes = list(plan_nodes(result["Plan"]))
+    return {
+        "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+        "node_types": [n["Node Type"] for n in nodes],
+        "execution_ms": result["Execution Time"],
+    }
+
+
+async def run(args) -> dict:
+    async with open_postgres():
+        await delete_tagged_events(TAG)
+        try:
+            await seed(args.events)
+            results = {}
+            for name, arguments, expected in CASES:
+                results[name] = await explain(arguments, args.limit)
+                results[name]["expected_index"] = expected
+                results[name]["ok"] = expected in results[name]["indexes"]
+            return results
+        finally:
+            await delete_tagged_events(TAG)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    results = run_quietly(run, args)
+    print(json.dumps(results, indent=2))
+    if not all(result["ok"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
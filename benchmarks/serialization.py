@@ -0,0 +1,156 @@
+"""Rows per second serialized by the read_events and get_tickets_by_event paths.
+
+Serializes database-shaped rows the way each route used to and the way it
+does now, without a database, so the numbers isolate validation and JSON
+encoding:
+
+- ``read_events``: ``before`` built an EventResponse per row for the cache,
+  JSON-encoded it, then let FastAPI validate the list again through
+  ``response_model`` and encode it with the stdlib ``json``. ``now`` caches
+  the rows with orjson and validates and encodes the page once in
+  pydantic-core. Cache misses and hits are measured separately.
+- ``get_tickets_by_event``: ``before`` went through ``response_model`` and
+  ``JSONResponse``; ``now`` uses ``json_response``.
+
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from datetime import time as clock
+from datetime import timedelta, timezone
+from decimal import Decimal
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from common.cache import _encode
+from common.helpers import json_response
+from event.models import EventList, EventResponse
+from tickets.models import TicketList, TicketResponse
+
+
+def event_rows(n: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "event_id": str(i),
+            "event_name": f"Event {i}",
+            "description": "An evening of live music, food stalls and talks.",
+            "location": "Hall A",
+            "start_time": clock(18),
+            "end_time": clock(22),
+            "event_date": now + timedelta(hours=i),
+            "capacity": 500,
+            "organizer_id": "organizer",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def ticket_rows(n: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "ticket_id": i,
+            "event_id": 1,
+            "user_id": i % 1000,
+            "ticket_type": "General",
+            "price": Decimal("25.00"),
+            "purchased_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def through_response_model(model, content) -> bytes:
+    """What FastAPI does with a route's return value and ``response_model``."""
+    field = create_model_field(name="response", type_=model, mode="serialization")
+    serialized = asyncio.run(
+        serialize_response(field=field, response_content=content, is_coroutine=True)
+    )
+    return JSONResponse(serialized).body
+
+
+def events_before_miss(rows):
+    cached = jsonable_encoder([EventResponse(**row) for row in rows])
+    json.dumps(cached, separators=(",", ":"))
+    return through_response_model(List[EventResponse], cached)
+
+
+def events_before_hit(payload):
+    return through_response_model(List[EventResponse], json.loads(payload))
+
+
+def events_now_miss(rows):
+    _encode(rows)
+    return json_response(EventList, rows).body
+
+
+def events_now_hit(payload):
+    return json_response(EventList, orjson.loads(payload)).body
+
+
+def tickets_before(rows):
+    return through_response_model(List[TicketResponse], rows)
+
+
+def tickets_now(rows):
+    return json_response(TicketList, rows).body
+
+
+def rows_per_second(func, content, rows: int, repeat: int) -> float:
+    func(content)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(content)
+    return round(rows * repeat / (time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="rows per response")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    events, tickets = event_rows(args.rows), ticket_rows(args.rows)
+    before_payload = json.dumps(jsonable_encoder(events), separators=(",", ":"))
+    now_payload = _encode(events)
+    # Both paths must produce the same response body.
+    assert events_before_hit(before_payload) == events_now_hit(now_payload)
+    assert tickets_before(tickets) == tickets_now(tickets)
+
+    cases = {
+        "read_events (cache miss)": (
+            (events_before_miss, events),
+            (events_now_miss, events),
+        ),
+        "read_events (cache hit)": (
+            (events_before_hit, before_payload),
+            (events_now_hit, now_payload),
+        ),
+        "get_tickets_by_event": ((tickets_before, tickets), (tickets_now, tickets)),
+    }
+    results = {}
+    for name, ((before, before_input), (now, now_input)) in cases.items():
+        before_rate = rows_per_second(before, before_input, args.rows, args.repeat)
+        now_rate = rows_per_second(now, now_input, args.rows, args.repeat)
+        results[name] = {
+            "before_rows_per_second": before_rate,
+            "now_rows_per_second": now_rate,
+            "speedup": round(now_rate / before_rate, 2),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Redis memory per session: full token per user against jti per device.
+
+Loads ``--sessions`` sessions into Redis in each layout, measures the growth
+of ``used_memory`` (``INFO memory``) and removes them again:
+
+- ``token``: the previous layout, one hash per user holding the whole JWT
+  and the cached profile, so one session per user.
+- ``jti``: the current layout (``auth.sessions.store_session``), one hash
+  per user holding a jti and expiry per device next to the profile, with
+  ``--devices`` sessions per user.
+
+The report gives bytes per session, MB per million sessions and
+``MEMORY USAGE`` of one sample key per layout, as JSON. Needs a real Redis
+(fakeredis has no ``INFO``) with room for the sessions; keys are tagged
+``session:bench-sessions-``.
+
+    python -m benchmarks.session_memory --sessions 1000000 --devices 2
+"""
+
+import argparse
+import asyncio
+import json
+import uuid
+
+from auth.models import UserResponse
+from auth.routes import ACCESS_TOKEN_EXPIRE_MINUTES
+from auth.sessions import new_jti, session_key, store_session
+from benchmarks._common import make_token, open_redis, run_quietly, unlink_matching
+
+TAG = "bench-sessions-"
+TTL = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+PIPELINE_SIZE = 1000
+
+
+def email_for(user: int) -> str:
+    return f"{TAG}{user}@example.com"
+
+
+def profile_for(user: int) -> UserResponse:
+    return UserResponse(
+        id=str(uuid.UUID(int=user)),
+        name=f"Bench user {user}",
+        email=email_for(user),
+        role="attendee",
+    )
+
+
+async def used_memory(redis_client) -> int:
+    return (await redis_client.info("memory"))["used_memory"]
+
+
+async def cleanup(redis_client):
+    await unlink_matching(redis_client, session_key(f"{TAG}*"))
+
+
+async def load_token_layout(redis_client, sessions: int) -> int:
+    """Write one full-token session per user, as login used to."""
+    for start in range(0, sessions, PIPELINE_SIZE):
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for user in range(start, min(start + PIPELINE_SIZE, sessions)):
+                # The claims a login token had before jti sessions.
+                token = make_token(email_for(user), str(uuid.UUID(int=user)))
+                key = session_key(email_for(user))
+                pipe.hset(
+                    key, mapping={"token": token, **profile_for(user).model_dump()}
+                )
+                pipe.expire(key, TTL)
+            await pipe.execute()
+    return sessions
+
+
+async def load_jti_layout(
+    redis_client, sessions: int, devices: int, concurrency: int
+) -> int:
+    """Sign each user in on ``devices`` devices through store_session."""
+    users = -(-sessions // devices)
+    for start in range(0, users, concurrency):
+        end = min(start + concurrency, users)
+        for device in range(devices):
+            await asyncio.gather(
+                *(
+                    store_session(
+                        redis_client,
+                        email_for(user),
+                        new_jti(),
+                        profile_for(user),
+                        TTL,
+                    )
+                    for user in range(start, end)
+                    if user * devices + device < sessions
+                )
+            )
+    return users
+
+
+async def measure(redis_client, layout: str, args) -> dict:
+    await cleanup(redis_client)
+    before = await used_memory(redis_client)
+    if layout == "token":
+        keys = await load_token_layout(redis_client, args.sessions)
+    else:
+        keys = await load_jti_layout(
+            redis_client, args.sessions, args.devices, args.concurrency
+        )
+    grown = await used_memory(redis_client) - before
+    sample = await redis_client.memory_usage(session_key(email_for(0)))
+    await cleanup(redis_client)
+    bytes_per_session = grown / args.sessions
+    return {
+        "sessions": args.sessions,
+        "keys": keys,
+        "used_memory_bytes": grown,
+        "bytes_per_session": round(bytes_per_session, 1),
+        "mb_per_million_sessions": round(bytes_per_session * 1_000_000 / 2**20, 1),
+        "sample_key_bytes": sample,
+    }
+
+
+async def bench(args) -> dict:
+    async with open_redis() as redis_client:
+        results = {
+            layout: await measure(redis_client, layout, args)
+            for layout in ("token", "jti")
+        }
+    results["jti"]["devices_per_user"] = args.devices
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument(
+        "--devices", type=int, default=1, help="sessions per user in the jti layout"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=100, help="store_session calls at once"
+    )
+    args = parser.parse_args()
+
+    results = run_quietly(bench, args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
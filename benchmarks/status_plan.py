@@ -0,0 +1,148 @@
+"""Check the event status scheduler and status listing use their indexes.
+
+Seeds ``--events`` tagged events whose days spread over the past eleven
+months and the next one, past ones mostly COMPLETED (removed afterwards),
+and ANALYZEs the table. It then runs ``EXPLAIN (ANALYZE, FORMAT JSON)`` on
+the statements ``GET /event/?status=`` builds and on both scheduler UPDATEs
+(rolled back), and finally times one real ``advance_event_statuses()`` run,
+cache invalidation included, so have Redis up. That run also advances any
+other due events in the database, as the scheduler would. Prints the
+indexes each plan used and the timings as JSON, and exits 1 if a plan
+missed its expected index. Run the migrations first.
+
+    python -m benchmarks.status_plan --events 50000
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from psycopg import sql
+
+from benchmarks._common import delete_tagged_events, open_postgres, run_quietly
+from benchmarks.search_plan import plan_nodes
+from common.database import postgresql_connection
+from event.search import build_list_query
+from event.status import END_EVENTS, START_EVENTS, advance_event_statuses
+
+TAG = "bench-status-"
+LIST_INDEX = "idx_events_status_event_date_event_id"
+
+
+async def seed(events: int):
+    async with postgresql_connection() as db_conn:
+        await db_conn.cursor.execute(
+            """INSERT INTO events (event_name, description, location, start_time, end_time, event_date)
+               SELECT %s || n::text, 'Status benchmark', 'Hall A', '10:00', '12:00',
+                      date_trunc('day', now()) + ((n %% 366) - 335) * interval '1 day'
+               FROM generate_series(1, %s) AS n;""",
+            (TAG, events),
+        )
+        # Most past events are done. A few were missed while the scheduler
+        # was down: some never started, some never ended.
+        await db_conn.cursor.execute(
+            """UPDATE events
+               SET status = CASE split_part(event_name, '-', 3)::int %% 20
+                                WHEN 0 THEN 'UPCOMING'
+                                WHEN 1 THEN 'ONGOING'
+                                ELSE 'COMPLETED' END
+               WHERE event_name LIKE %s AND event_date < date_trunc('day', now());""",
+            (f"{TAG}%",),
+        )
+        await db_conn.cursor.execute("ANALYZE events;")
+
+
+async def first_keyset(status: str, limit: int):
+    query, params = build_list_query(status, None, limit, 0)
+    async with postgresql_connection() as db_conn:
+        await db_conn.cursor.execute(query, params)
+        rows = await db_conn.cursor.fetchall()
+    return (rows[-1]["event_date"], rows[-1]["event_id"]) if rows else None
+
+
+async def explain(query, params) -> dict:
+    async with postgresql_connection() as db_conn:
+        await db_conn.cursor.execute(
+            sql.SQL("EXPLAIN (ANALYZE, FORMAT JSON) ") + query, params
+        )
+        result = (await db_conn.cursor.fetchone())["QUERY PLAN"][0]
+        # EXPLAIN ANALYZE runs the UPDATEs; keep the data as it was.
+        await db_conn.connection.rollback()
+    nodes = list(plan_nodes(result["Plan"]))
+    return {
+        "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+        "node_types": [n["Node Type"] for n in nodes],
+        "execution_ms": result["Execution Time"],
+    }
+
+
+async def run(args) -> dict:
+    async with open_postgres():
+        await delete_tagged_events(TAG)
+        try:
+            await seed(args.events)
+            keyset = await first_keyset("UPCOMING", args.limit)
+            # (name, statement, parameters, index the plan must use)
+            cases = [
+                (
+                    "list UPCOMING",
+                    *build_list_query("UPCOMING", None, args.limit, 0),
+                    LIST_INDEX,
+                ),
+                (
+                    "list UPCOMING after cursor",
+                    *build_list_query("UPCOMING", keyset, args.limit, 0),
+                    LIST_INDEX,
+                ),
+                (
+                    "start due events",
+                    START_EVENTS,
+                    [args.batch_size],
+                    "idx_events_upcoming_starts_at",
+                ),
+                (
+                    "end due events",
+                    END_EVENTS,
+                    [args.batch_size],
+                    "idx_events_ongoing_ends_at",
+                ),
+            ]
+            results = {}
+            for name, query, params, expected in cases:
+                results[name] = await explain(query, params)
+                results[name]["expected_index"] = expected
+                results[name]["ok"] = expected in results[name]["indexes"]
+
+            start = time.perf_counter()
+            counts = await advance_event_statuses()
+            seconds = time.perf_counter() - start
+            changed = counts["started"] + counts["ended"]
+            results["advance_event_statuses"] = {
+                **counts,
+                "seconds": round(seconds, 4),
+                "events_per_second": round(changed / seconds, 1),
+                "ok": True,
+            }
+            return results
+        finally:
+            await delete_tagged_events(TAG)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="LIMIT for the UPDATE plans"
+    )
+    args = parser.parse_args()
+
+    results = run_quietly(run, args)
+    print(json.dumps(results, indent=2))
+    if not all(result["ok"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
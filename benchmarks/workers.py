@@ -0,0 +1,246 @@
+"""Throughput of the production server with 1 worker against N workers.
+
+For each ``--workers`` count, starts the server the way ``python main.py
+--workers N`` does, on a local port, waits for ``/readyz`` and warms it
+up. It then drives a read mix (event detail, a list page and a batch of
+20, in turn) from ``--clients`` load generator processes with
+``--concurrency`` connections each for ``--seconds``. The report gives
+requests per second, p50/p95/p99 latency and errors per worker count, and
+the speed-up over the first count, as JSON.
+
+The load generator runs on the same machine and needs cores of its own:
+on C cores, workers beyond about C minus ``--clients`` only add
+contention, and on one core N workers cannot beat one. Record the core
+count with the numbers.
+
+    python -m benchmarks.workers --workers 1 4 --seconds 20
+    python -m benchmarks.workers --stand-ins  # fakeredis + mongomock
+
+PostgreSQL must already have the schema. Seeded events are tagged
+``bench-workers-`` and removed afterwards. With ``--stand-ins`` every worker
+gets its own in-memory Redis and MongoDB, so the event cache is per worker
+rather than shared.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks._common import (
+    delete_tagged_events,
+    make_token,
+    open_postgres,
+    percentile,
+    run_quietly,
+    use_stand_ins,
+)
+from common.database import postgresql_connection
+
+TAG = "bench-workers-"
+HOST = "127.0.0.1"
+
+
+def __getattr__(name):
+    # "benchmarks.workers:stand_in_app" for the worker processes: each one
+    # installs its own stand-ins before the lifespan connects.
+    if name == "stand_in_app":
+        use_stand_ins()
+        from main import app
+
+        return app
+    raise AttributeError(name)
+
+
+async def seed(events: int) -> list:
+    async with open_postgres():
+        await delete_tagged_events(TAG)
+        async with postgresql_connection() as db_conn:
+            await db_conn.cursor.execute(
+                """INSERT INTO events (event_name, description, location, start_time, end_time, event_date)
+                   SELECT %s || n::text, 'Workers benchmark', 'Hall ' || (n %% 20)::text,
+                          '18:00', '22:00', %s::timestamptz + n * interval '1 hour'
+                   FROM generate_series(1, %s) AS n
+                   RETURNING event_id;""",
+                (TAG, datetime(2030, 1, 1, tzinfo=timezone.utc), events),
+            )
+            return [row["event_id"] for row in await db_conn.cursor.fetchall()]
+
+
+async def cleanup():
+    async with open_postgres():
+        await delete_tagged_events(TAG)
+
+
+def request_for(i: int, events: list) -> tuple[str, dict]:
+    event_id = events[i % len(events)]
+    if i % 3 == 0:
+        return f"/event/{event_id}", {}
+    if i % 3 == 1:
+        return "/event/", {"skip": (i * 20) % len(events), "limit": 20}
+    ids = ",".join(str(events[(i + k) % len(events)]) for k in range(20))
+    return "/event/batch", {"ids": ids}
+
+
+async def drive(base_url: str, token: str, events: list, concurrency: int, seconds):
+    """Send requests from ``concurrency`` connections until ``seconds`` pass."""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=30
+    ) as client:
+
+        async def connection(offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                path, params = request_for(i, events)
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path, params=params)
+                    failed = response.is_error
+                except httpx.HTTPError:
+                    failed = True
+                latencies.append(time.perf_counter() - start)
+                errors += failed
+                i += concurrency
+
+        await asyncio.gather(*(connection(k) for k in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(base_url, token, events, concurrency, seconds, offset):
+    # Each load generator starts at a different point in the event list.
+    return asyncio.run(
+        drive(base_url, token, events[offset:] + events[:offset], concurrency, seconds)
+    )
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        with contextlib.suppress(httpx.HTTPError):
+            if httpx.get(f"{base_url}/readyz", timeout=2).status_code == 200:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"server not ready after {timeout} seconds")
+
+
+def start_server(workers: int, args) -> subprocess.Popen:
+    command = [sys.executable, "-m", "benchmarks.workers", "--serve", str(workers)]
+    command += ["--port", str(args.port)]
+    if args.stand_ins:
+        command.append("--stand-ins")
+    # Background jobs would compete with the measured requests.
+    env = {
+        **os.environ,
+        "INVENTORY_RECONCILE_INTERVAL": "0",
+        "EVENT_STATUS_INTERVAL": "0",
+    }
+    return subprocess.Popen(command, env=env, stdout=sys.stderr, stderr=sys.stderr)
+
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def measure(workers: int, events: list, args) -> dict:
+    base_url = f"http://{HOST}:{args.port}"
+    token = make_token(f"{TAG}user@example.com", 0)
+    server = start_server(workers, args)
+    try:
+        wait_until_ready(base_url, server, args.startup_timeout)
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(args.clients) as pool:
+            jobs = [
+                (base_url, token, events, args.concurrency, seconds, k * 997)
+                for seconds in (args.warmup, args.seconds)
+                for k in range(args.clients)
+            ]
+            warmup, measured = jobs[: args.clients], jobs[args.clients :]
+            pool.starmap(client_process, warmup)
+            results = pool.starmap(client_process, measured)
+    finally:
+        stop_server(server)
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / args.seconds, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def bench(args) -> dict:
+    events = asyncio.run(seed(args.events))
+    try:
+        runs = [measure(workers, events, args) for workers in args.workers]
+    finally:
+        asyncio.run(cleanup())
+    baseline = runs[0]["requests_per_second"] or 1
+    for run in runs:
+        run["speedup"] = round(run["requests_per_second"] / baseline, 2)
+    return {
+        "cpu_count": os.cpu_count(),
+        "clients": args.clients,
+        "concurrency": args.concurrency,
+        "seconds": args.seconds,
+        "stand_ins": args.stand_ins,
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=2, help="load processes")
+    parser.add_argument(
+        "--concurrency", type=int, default=32, help="connections per load process"
+    )
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument(
+        "--stand-ins", action="store_true", help="use fakeredis and mongomock"
+    )
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        from main import serve
+
+        app_path = "benchmarks.workers:stand_in_app" if args.stand_ins else "main:app"
+        serve(args.serve, HOST, args.port, app_path)
+        return
+
+    results = run_quietly(bench, args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,73 @@
+import hashlib
 import os
-from datetime import datetime, timezone
+import time
+from collections import OrderedDict
 
 import jwt
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from auth.constants import ValidRoles
+
 load_dotenv()
 
 # Secret key and algorithm for JWT
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 
+# Verified payloads are reused until the token's own exp or the TTL,
+# whichever comes first, so a cached entry never outlives its token.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+_token_cache: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+_token_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _get_cached_payload(digest: bytes):
+    entry = _token_cache.get(digest)
+    if entry is None:
+        return None
+    expires_at, payload = entry
+    if expires_at <= time.time():
+        del _token_cache[digest]
+        return None
+    _token_cache.move_to_end(digest)
+    return payload
+
+
+def _cache_payload(digest: bytes, payload: dict):
+    expires_at = min(time.time() + TOKEN_CACHE_TTL, payload["exp"])
+    _token_cache[digest] = (expires_at, payload)
+    _token_cache.move_to_end(digest)
+    while len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+
 
-def verify_token(token: str = Depends(oauth2_scheme)):
+def get_token_cache_stats() -> dict:
+    return {"size": len(_token_cache), **_token_cache_stats}
+
+
+async def verify_token(token: str = Depends(oauth2_scheme)):
+    digest = _token_digest(token)
+    payload = _get_cached_payload(digest)
+    if payload is not None:
+        _token_cache_stats["hits"] += 1
+        return dict(payload)
+
+    _token_cache_stats["misses"] += 1
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        exp_time = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
-        current_time = datetime.now(timezone.utc)
-        if exp_time < current_time:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has expired",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return payload
+        # jwt.decode rejects expired tokens itself.
+        payload = jwt.decode(
+            token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp"]}
+        )
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -39,3 +80,18 @@ def verify_token(token: str = Depends(oauth2_scheme)):
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    _cache_payload(digest, payload)
+    return dict(payload)
+
+
+async def require_admin(token_payload: dict = Depends(verify_token)):
+    """Let only admins through, by the ``role`` claim set at login.
+
+    The claim is signed with the token, so a role change applies from the
+    user's next login.
+    """
+    if token_payload.get("role") != ValidRoles.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required"
+        )
+    return token_payload
@@ -0,0 +1,139 @@
+import os
+from typing import Optional
+
+import orjson
+import redis
+from fastapi.encoders import jsonable_encoder
+
+from common.database import RedisConnection
+
+EVENT_CACHE_TTL = int(os.getenv("EVENT_CACHE_TTL", "300"))
+EVENT_LIST_CACHE_TTL = int(os.getenv("EVENT_LIST_CACHE_TTL", "60"))
+
+# Bump the version when the cached payload shape changes so old entries
+# are never read back into the new format.
+CACHE_VERSION = "v1"
+EVENT_LIST_INDEX_KEY = f"cache:{CACHE_VERSION}:events:list:keys"
+
+_stats = {"hits": 0, "misses": 0, "errors": 0}
+
+
+def event_key(event_id) -> str:
+    return f"cache:{CACHE_VERSION}:event:{event_id}"
+
+
+def event_list_key(*params) -> str:
+    return f"cache:{CACHE_VERSION}:events:list:" + ":".join(str(p) for p in params)
+
+
+def _encode(value) -> bytes:
+    # orjson covers the row types (datetime, time, UUID) natively; anything
+    # else (Decimal, models) falls back to FastAPI's encoder.
+    return orjson.dumps(value, default=jsonable_encoder)
+
+
+async def get_cached(key: str):
+    """Return the decoded cache entry for ``key``, or None on a miss."""
+    try:
+        payload = await RedisConnection().connection.get(key)
+    except redis.RedisError as e:
+        _stats["errors"] += 1
+        print(f"Cache read failed: {e}")
+        return None
+    if payload is None:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    return orjson.loads(payload)
+
+
+async def set_cached(key: str, value, ttl: int, index_key: Optional[str] = None):
+    """Store ``value`` as JSON under ``key``, optionally tracked in a key set."""
+    payload = _encode(value)
+    try:
+        async with RedisConnection().connection.pipeline(transaction=False) as pipe:
+            pipe.set(key, payload, ex=ttl)
+            if index_key:
+                pipe.sadd(index_key, key)
+                pipe.expire(index_key, ttl)
+            await pipe.execute()
+    except redis.RedisError as e:
+        _stats["errors"] += 1
+        print(f"Cache write failed: {e}")
+
+
+async def read_through(key: str, ttl: int, loader, index_key: Optional[str] = None):
+    """Serve ``key`` from Redis, falling back to ``loader`` and caching it.
+
+    ``loader`` is an async callable; a None result is not cached. A hit
+    returns the decoded JSON, a miss the loader's value as is; both are
+    meant to be validated once by the route's response model. Redis errors
+    degrade to a cache miss so reads keep working without Redis.
+    """
+    cached = await get_cached(key)
+    if cached is not None:
+        return cached
+    value = await loader()
+    if value is not None:
+        await set_cached(key, value, ttl, index_key)
+    return value
+
+
+async def read_through_many(keys: dict, ttl: int, loader) -> dict:
+    """Multi-key read_through: serve ``{id: key}`` with one MGET.
+
+    ``loader`` is called once with the ids that missed and returns
+    ``{id: value}`` for those it found; those are cached in one pipeline.
+    Returns ``{id: value}`` for every id found in either place.
+    """
+    ids = list(keys)
+    try:
+        payloads = await RedisConnection().connection.mget([keys[i] for i in ids])
+    except redis.RedisError as e:
+        _stats["errors"] += 1
+        print(f"Cache read failed: {e}")
+        payloads = [None] * len(ids)
+
+    found, missing = {}, []
+    for item_id, payload in zip(ids, payloads):
+        if payload is None:
+            missing.append(item_id)
+        else:
+            found[item_id] = orjson.loads(payload)
+    _stats["hits"] += len(found)
+    _stats["misses"] += len(missing)
+    if not missing:
+        return found
+
+    loaded = await loader(missing)
+    if loaded:
+        try:
+            async with RedisConnection().connection.pipeline(transaction=False) as pipe:
+                for item_id, value in loaded.items():
+                    pipe.set(keys[item_id], _encode(value), ex=ttl)
+                await pipe.execute()
+        except redis.RedisError as e:
+            _stats["errors"] += 1
+            print(f"Cache write failed: {e}")
+    return {**found, **loaded}
+
+
+async def invalidate_event(*event_ids):
+    """Drop the cached details for ``event_ids`` and every cached list page."""
+    redis_client = RedisConnection().connection
+    try:
+        list_keys = await redis_client.smembers(EVENT_LIST_INDEX_KEY)
+        keys = [*list_keys, EVENT_LIST_INDEX_KEY]
+        keys.extend(event_key(event_id) for event_id in event_ids)
+        await redis_client.delete(*keys)
+    except redis.RedisError as e:
+        _stats["errors"] += 1
+        print(f"Cache invalidation failed: {e}")
+
+
+def get_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+    }
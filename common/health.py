@@ -0,0 +1,54 @@
+import asyncio
+import os
+import time
+
+from common.database import MongoDBConnection, PostgresPool, RedisConnection
+
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+
+async def _ping_postgres():
+    # The pool's own state is informational: a saturated pool means slow
+    # requests, not a worker that should leave the load balancer.
+    await PostgresPool().ping()
+    stats = PostgresPool().stats()
+    return {key: stats[key] for key in ("in_use", "idle", "waiting")}
+
+
+async def _ping_redis():
+    await RedisConnection().connection.ping()
+
+
+async def _ping_mongodb():
+    await MongoDBConnection().db.command("ping")
+
+
+# Backend name -> (singleton class, round-trip check).
+BACKENDS = {
+    "postgres": (PostgresPool, _ping_postgres),
+    "redis": (RedisConnection, _ping_redis),
+    "mongodb": (MongoDBConnection, _ping_mongodb),
+}
+
+
+async def _check(connection_class, ping) -> dict:
+    # Checking must not create a connection the lifespan has not opened.
+    if connection_class._instance is None:
+        return {"status": "down", "error": "not initialized"}
+    start = time.perf_counter()
+    try:
+        details = await asyncio.wait_for(ping(), HEALTH_CHECK_TIMEOUT)
+    except Exception as e:
+        status = {"status": "down", "error": str(e) or type(e).__name__}
+    else:
+        status = {"status": "up", **(details or {})}
+    status["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return status
+
+
+async def check_backends() -> dict:
+    """Ping every backend concurrently and report status and latency."""
+    results = await asyncio.gather(
+        *(_check(cls, ping) for cls, ping in BACKENDS.values())
+    )
+    return dict(zip(BACKENDS, results))
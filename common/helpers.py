@@ -1,9 +1,17 @@
+import asyncio
+import base64
+import json
+import os
 from functools import wraps
 
-import psycopg2
-from fastapi import HTTPException, status
+import psycopg
+from fastapi import HTTPException, Response, status
+from pydantic import TypeAdapter
 from pymongo.errors import PyMongoError
 
+from common.database import RedisConnection
+from common.metrics import current_route, record_db_error
+
 
 def db_connection_handler(func):
     @wraps(func)
@@ -11,9 +19,12 @@ def db_connection_handler(func):
         try:
             return await func(*args, **kwargs)
 
-        except (psycopg2.Error, PyMongoError) as e:
-            db_type = "PostgreSQL" if isinstance(e, psycopg2.Error) else "MongoDB"
+        except HTTPException:
+            raise
+        except (psycopg.Error, PyMongoError) as e:
+            db_type = "PostgreSQL" if isinstance(e, psycopg.Error) else "MongoDB"
             print(f"{db_type} error: {e}")
+            record_db_error(db_type)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"{db_type} operation failed: {str(e)}",
@@ -25,3 +36,57 @@ def db_connection_handler(func):
             )
 
     return wrapper
+
+
+def encode_cursor(*values) -> str:
+    """Pack the sort key of the last row on a page into an opaque cursor."""
+    payload = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Unpack a cursor built by encode_cursor, raising ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def json_response(adapter: TypeAdapter, content, **kwargs) -> Response:
+    """Validate ``content`` once and encode it to JSON in pydantic-core.
+
+    For list routes: replaces FastAPI's validate-then-serialize pass over
+    every row. Keep ``response_model`` on the route for the OpenAPI schema.
+    """
+    return Response(
+        adapter.dump_json(adapter.validate_python(content)),
+        media_type="application/json",
+        **kwargs,
+    )
+
+
+async def run_periodically(interval: float, func, *args, exclusive: bool = False):
+    """Await ``func(*args)`` every ``interval`` seconds until cancelled.
+
+    Failures are logged and the loop keeps going; meant to be started as a
+    task from the app lifespan. Its queries are tagged ``task:<name>`` in
+    the metrics instead of a route. With ``exclusive``, each run first takes
+    a Redis lock that expires after ``interval``, so across all workers the
+    job runs once per interval.
+    """
+    task = f"task:{func.__name__}"
+    current_route.set(task)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if exclusive and not await RedisConnection().connection.set(
+                f"{task}:lock", os.getpid(), nx=True, px=int(interval * 1000)
+            ):
+                continue
+            await func(*args)
+        except Exception as e:
+            print(f"{func.__name__} failed: {e}")
@@ -0,0 +1,192 @@
+import os
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.routing import Match
+
+# With several workers, set this to a directory so every worker writes its
+# samples there and any worker's /metrics reports them all. prometheus_client
+# reads it at import and opens files there as metrics are defined below.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+# Route templates ("/event/{event_id}") rather than raw paths keep the label
+# sets bounded; requests that match no route share one label.
+UNMATCHED_ROUTE = "unmatched"
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+DB_ERRORS = Counter(
+    "db_errors_total",
+    "Database errors turned into 500s by db_connection_handler or hit by jobs",
+    ["database", "route"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "PostgreSQL statement execution time",
+    ["route", "statement"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_ROWS = Histogram(
+    "db_query_rows",
+    "Rows returned or affected per PostgreSQL statement",
+    ["route", "statement"],
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000),
+)
+REVIEW_INGEST_BACKLOG = Gauge(
+    "review_ingest_backlog",
+    "Reviews accepted into the Redis stream but not yet written to MongoDB",
+    # Every worker samples the same stream; report the latest sample once.
+    multiprocess_mode="livemostrecent",
+)
+REVIEW_INGEST_LAG = Gauge(
+    "review_ingest_lag_seconds",
+    "Age of the oldest review in the Redis stream; 0 when it is empty",
+    multiprocess_mode="livemostrecent",
+)
+REVIEW_INGEST_WRITTEN = Counter(
+    "review_ingest_written_total",
+    "Reviews drained from the Redis stream, by whether they were new",
+    ["outcome"],
+)
+REVIEW_INGEST_BATCH = Histogram(
+    "review_ingest_batch_size",
+    "Reviews per insert_many issued by the stream consumer",
+    buckets=(1, 10, 50, 100, 250, 500, 1000),
+)
+
+# "METHOD /route/{template}" of the request being served, for code below
+# the middleware (database metrics, the slow-query log).
+current_route: ContextVar[str] = ContextVar("current_route", default=UNMATCHED_ROUTE)
+
+
+def _route_template(app, scope) -> str:
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording count, latency and in-flight per route.
+
+    Latency runs until the response body is complete, so streamed
+    responses are timed in full.
+    """
+
+    def __init__(self, app, router_app):
+        self.app = app
+        self.router_app = router_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = _route_template(self.router_app, scope)
+        token = current_route.set(f"{method} {route}")
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            in_flight.dec()
+            current_route.reset(token)
+
+
+def record_db_error(database: str):
+    DB_ERRORS.labels(database, current_route.get()).inc()
+
+
+def record_db_query(statement: str, seconds: float, rows: int):
+    route = current_route.get()
+    DB_QUERY_DURATION.labels(route, statement).observe(seconds)
+    DB_QUERY_ROWS.labels(route, statement).observe(rows)
+
+
+def record_review_ingest(backlog: int, lag_seconds: float):
+    REVIEW_INGEST_BACKLOG.set(backlog)
+    REVIEW_INGEST_LAG.set(lag_seconds)
+
+
+def record_review_batch(inserted: int, duplicates: int):
+    REVIEW_INGEST_BATCH.observe(inserted + duplicates)
+    REVIEW_INGEST_WRITTEN.labels("inserted").inc(inserted)
+    REVIEW_INGEST_WRITTEN.labels("duplicate").inc(duplicates)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Return the Prometheus text exposition and its content type.
+
+    In multiprocess mode the samples of every worker, live or exited, are
+    merged; otherwise only this worker's are reported.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def clear_multiprocess_metrics():
+    """Delete samples left by an earlier run; called before workers start."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        for path in Path(PROMETHEUS_MULTIPROC_DIR).glob("*.db"):
+            path.unlink()
+
+
+def mark_worker_stopped():
+    """Drop this worker's live gauges from the merged metrics on shutdown."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
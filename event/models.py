@@ -1,7 +1,7 @@
 from datetime import datetime, time, timezone
-from typing import Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, conint, constr
+from pydantic import BaseModel, Field, TypeAdapter, conint, constr
 
 from event.constants import EventStatus
 
@@ -14,6 +14,7 @@ class EventCreate(BaseModel):
     end_time: time
     event_date: datetime
     status: str = EventStatus.UPCOMING
+    capacity: Optional[conint(ge=0)] = None  # None means no seat limit
 
     def validate_status(self):
         if self.status not in EventStatus.values():
@@ -30,6 +31,7 @@ class EventUpdate(BaseModel):
     end_time: time
     event_date: datetime
     status: Optional[str]
+    capacity: Optional[conint(ge=0)] = None  # None keeps the current capacity
 
     def validate_status(self):
         if self.status and self.status not in EventStatus.values():
@@ -47,12 +49,33 @@ class EventResponse(EventCreate):
     updated_at: datetime
 
 
+class EventSearchResult(EventResponse):
+    rank: Optional[float] = None  # Text relevance; None without a text query
+
+
+class EventBatchResponse(BaseModel):
+    events: List[EventResponse]  # In the order the ids were requested
+    missing: List[str]
+
+
 class ReviewCreate(BaseModel):
     rating: conint(ge=1, le=5)  # Rating between 1 and 5
     comment: constr(max_length=500)
-    created_at: datetime = datetime.now(timezone.utc)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
 class ReviewResponse(ReviewCreate):
     event_id: str
     user_id: str
+
+
+class ReviewSummary(BaseModel):
+    event_id: str
+    review_count: int
+    average_rating: Optional[float]
+    histogram: Dict[int, int]  # Rating (1-5) -> number of reviews
+
+
+# Validate and serialize whole lists at once (see common.helpers.json_response).
+EventList = TypeAdapter(List[EventResponse])
+ReviewList = TypeAdapter(List[ReviewResponse])
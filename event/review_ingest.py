@@ -0,0 +1,273 @@
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime
+
+import orjson
+import redis
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from common.database import MongoDBConnection, RedisConnection
+from common.metrics import (
+    current_route,
+    record_db_error,
+    record_review_batch,
+    record_review_ingest,
+)
+
+from .reviews import apply_reviews_to_summaries
+
+# "direct" inserts each review into MongoDB inside the request. "stream"
+# appends it to a Redis stream and answers 202 at once; a consumer in every
+# worker drains the stream into MongoDB with insert_many. The stream is as
+# durable as the Redis persistence settings (use AOF for write-behind).
+REVIEW_WRITE_MODE = os.getenv("REVIEW_WRITE_MODE", "direct")
+REVIEW_INGEST_BATCH_SIZE = int(os.getenv("REVIEW_INGEST_BATCH_SIZE", "500"))
+# How long a batch may wait to fill up after its first review arrived.
+REVIEW_INGEST_MAX_WAIT_MS = int(os.getenv("REVIEW_INGEST_MAX_WAIT_MS", "200"))
+# Reviews another consumer read but did not acknowledge for this long (its
+# worker died mid-batch) are taken over.
+REVIEW_INGEST_CLAIM_IDLE_MS = int(os.getenv("REVIEW_INGEST_CLAIM_IDLE_MS", "60000"))
+# Deliveries after which a review MongoDB keeps rejecting (other than as a
+# duplicate) is moved to the dead-letter stream instead of retried again.
+REVIEW_INGEST_MAX_ATTEMPTS = int(os.getenv("REVIEW_INGEST_MAX_ATTEMPTS", "5"))
+
+REVIEW_STREAM = "reviews:ingest"
+REVIEW_DEAD_LETTER_STREAM = "reviews:ingest:dead"
+REVIEW_GROUP = "review-writers"
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _encode(review: dict) -> str:
+    return orjson.dumps({**review, "_id": str(review["_id"])}).decode()
+
+
+def _decode(payload: str) -> dict:
+    review = orjson.loads(payload)
+    review["_id"] = ObjectId(review["_id"])
+    review["created_at"] = datetime.fromisoformat(review["created_at"])
+    return review
+
+
+async def ensure_review_stream(redis_client):
+    """Create the stream and its consumer group; called once per worker."""
+    try:
+        await redis_client.xgroup_create(
+            REVIEW_STREAM, REVIEW_GROUP, id="0", mkstream=True
+        )
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def enqueue_review(review: dict):
+    """Accept a review for write-behind.
+
+    The ``_id`` is assigned here, so a batch that is retried after a
+    partial write inserts every review exactly once.
+    """
+    review["_id"] = ObjectId()
+    try:
+        await RedisConnection().connection.xadd(
+            REVIEW_STREAM, {"review": _encode(review)}
+        )
+    except redis.RedisError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Review queue unavailable: {e}",
+        )
+
+
+async def _read_new(redis_client, consumer: str) -> list:
+    """Read up to a full batch, waiting at most MAX_WAIT after the first entry."""
+    entries, deadline = [], None
+    while len(entries) < REVIEW_INGEST_BATCH_SIZE:
+        if deadline is None:
+            wait_ms = REVIEW_INGEST_MAX_WAIT_MS
+        else:
+            wait_ms = int((deadline - time.monotonic()) * 1000)
+            if wait_ms <= 0:
+                break
+        response = await redis_client.xreadgroup(
+            REVIEW_GROUP,
+            consumer,
+            {REVIEW_STREAM: ">"},
+            count=REVIEW_INGEST_BATCH_SIZE - len(entries),
+            block=wait_ms,
+        )
+        if not response:
+            break
+        entries.extend(response[0][1])
+        if deadline is None:
+            deadline = time.monotonic() + REVIEW_INGEST_MAX_WAIT_MS / 1000
+    return entries
+
+
+async def _read_pending(redis_client, consumer: str) -> list:
+    """Entries this consumer read earlier but did not acknowledge."""
+    response = await redis_client.xreadgroup(
+        REVIEW_GROUP,
+        consumer,
+        {REVIEW_STREAM: "0"},
+        count=REVIEW_INGEST_BATCH_SIZE,
+    )
+    return response[0][1] if response else []
+
+
+async def _claim_stale(redis_client, consumer: str):
+    start = "0-0"
+    while True:
+        # [next start id, claimed entries(, deleted ids on Redis 7)]
+        result = await redis_client.xautoclaim(
+            REVIEW_STREAM,
+            REVIEW_GROUP,
+            consumer,
+            min_idle_time=REVIEW_INGEST_CLAIM_IDLE_MS,
+            start_id=start,
+            count=REVIEW_INGEST_BATCH_SIZE,
+        )
+        start = result[0]
+        if start == "0-0":
+            return
+
+
+async def _delivery_counts(redis_client, entry_ids: list) -> dict:
+    pipe = redis_client.pipeline(transaction=False)
+    for entry_id in entry_ids:
+        pipe.xpending_range(
+            REVIEW_STREAM, REVIEW_GROUP, min=entry_id, max=entry_id, count=1
+        )
+    return {
+        entry_id: pending[0]["times_delivered"] if pending else 0
+        for entry_id, pending in zip(entry_ids, await pipe.execute())
+    }
+
+
+async def _write_batch(db, redis_client, entries: list):
+    batch, dead = [], []
+    for entry_id, fields in entries:
+        # Entries trimmed from the stream come back without fields.
+        if not fields:
+            continue
+        try:
+            batch.append((entry_id, fields, _decode(fields["review"])))
+        except (KeyError, ValueError) as e:
+            dead.append((entry_id, fields, f"Malformed entry: {e}"))
+    reviews = [review for _, _, review in batch]
+
+    unsummarized, failed, duplicates = reviews, set(), 0
+    if reviews:
+        for review in reviews:
+            review["summary_pending"] = True
+        try:
+            await db.reviews.insert_many(reviews, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            rejected = [
+                error for error in errors if error["code"] != DUPLICATE_KEY_ERROR
+            ]
+            if rejected:
+                # The rest of the batch was written (ordered=False), so a
+                # retry only tries the rejected reviews again.
+                attempts = await _delivery_counts(
+                    redis_client, [batch[error["index"]][0] for error in rejected]
+                )
+                if min(attempts.values()) < REVIEW_INGEST_MAX_ATTEMPTS:
+                    raise
+                dead += [
+                    (*batch[error["index"]][:2], error["errmsg"]) for error in rejected
+                ]
+            failed = {error["index"] for error in errors}
+            # Written by an earlier attempt at this batch; those whose
+            # summary update did not complete are still flagged.
+            written_before = failed - {error["index"] for error in rejected}
+            unsummarized = [r for i, r in enumerate(reviews) if i not in failed]
+            duplicates = len(written_before)
+            unsummarized += await db.reviews.find(
+                {
+                    "_id": {"$in": [reviews[i]["_id"] for i in written_before]},
+                    "summary_pending": True,
+                },
+                {"event_id": 1, "rating": 1},
+            ).to_list(None)
+        # Dying between these two writes counts the batch twice on retry;
+        # POST /event/reviews/summaries:rebuild repairs that.
+        await apply_reviews_to_summaries(db, unsummarized)
+        await db.reviews.update_many(
+            {"_id": {"$in": [review["_id"] for review in unsummarized]}},
+            {"$unset": {"summary_pending": ""}},
+        )
+
+    entry_ids = [entry_id for entry_id, _ in entries]
+    pipe = redis_client.pipeline(transaction=True)
+    for entry_id, fields, reason in dead:
+        pipe.xadd(
+            REVIEW_DEAD_LETTER_STREAM,
+            {**fields, "entry_id": entry_id, "error": reason},
+        )
+    pipe.xack(REVIEW_STREAM, REVIEW_GROUP, *entry_ids)
+    # Written entries leave the stream, so its length is the backlog.
+    pipe.xdel(REVIEW_STREAM, *entry_ids)
+    await pipe.execute()
+    for entry_id, _, reason in dead:
+        print(f"Moved review entry {entry_id} to {REVIEW_DEAD_LETTER_STREAM}: {reason}")
+    record_review_batch(len(reviews) - len(failed), duplicates)
+
+
+async def _record_lag(redis_client):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.xlen(REVIEW_STREAM)
+    pipe.xrange(REVIEW_STREAM, count=1)
+    backlog, oldest = await pipe.execute()
+    lag = 0.0
+    if oldest:
+        # Stream ids start with the millisecond they were added at.
+        added_ms = int(oldest[0][0].split("-")[0])
+        lag = max(time.time() - added_ms / 1000, 0.0)
+    record_review_ingest(backlog, lag)
+
+
+async def drain_review_stream():
+    """Write streamed reviews to MongoDB until cancelled; one per worker.
+
+    Consumers share the group, so each review goes to one worker. Entries
+    are acknowledged only after they were written, so a failed batch is
+    retried from this consumer's pending list, and a dead worker's batch is
+    claimed by another after REVIEW_INGEST_CLAIM_IDLE_MS. Reviews MongoDB
+    still rejects after REVIEW_INGEST_MAX_ATTEMPTS deliveries go to
+    REVIEW_DEAD_LETTER_STREAM.
+    """
+    current_route.set("task:drain_review_stream")
+    redis_client = RedisConnection().connection
+    db = MongoDBConnection().db
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    retry_pending, next_claim = True, 0.0
+    while True:
+        try:
+            if time.monotonic() >= next_claim:
+                await _claim_stale(redis_client, consumer)
+                next_claim = time.monotonic() + REVIEW_INGEST_CLAIM_IDLE_MS / 1000
+                retry_pending = True
+            if retry_pending:
+                entries = await _read_pending(redis_client, consumer)
+                retry_pending = bool(entries)
+            else:
+                entries = await _read_new(redis_client, consumer)
+            # Sampled ahead of the write, so it stays current while
+            # writes fail.
+            await _record_lag(redis_client)
+            if entries:
+                await _write_batch(db, redis_client, entries)
+        except (PyMongoError, redis.RedisError) as e:
+            db_type = "MongoDB" if isinstance(e, PyMongoError) else "Redis"
+            print(f"{db_type} error: {e}")
+            record_db_error(db_type)
+            retry_pending = True
+            await asyncio.sleep(1)
+        except Exception as e:
+            print(f"Review ingestion error: {e!r}")
+            retry_pending = True
+            await asyncio.sleep(1)
@@ -0,0 +1,158 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import ASCENDING, DeleteOne, IndexModel, UpdateOne
+
+# One document per event in ``review_summaries``:
+#   {_id: event_id, count, rating_sum, histogram: {"1": n, ..., "5": n}}
+# kept current with $inc on every review write, so reading an event's
+# rating never touches the reviews themselves.
+RATINGS = range(1, 6)
+
+# Only the fields ReviewResponse serializes, plus _id for the page cursor.
+REVIEW_PROJECTION = {
+    "event_id": 1,
+    "user_id": 1,
+    "rating": 1,
+    "comment": 1,
+    "created_at": 1,
+}
+REVIEW_SORT = [("created_at", ASCENDING), ("_id", ASCENDING)]
+
+
+async def ensure_review_indexes(db):
+    """Create the review indexes; called once per worker at startup."""
+    await db.reviews.create_indexes(
+        [
+            # Serves per-event listing in (created_at, _id) order; the _id
+            # suffix makes the page cursor an index seek as well.
+            IndexModel(
+                [("event_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]
+            ),
+            IndexModel([("user_id", ASCENDING)]),
+        ]
+    )
+
+
+async def apply_review_to_summary(db, event_id: str, rating: int, delta: int = 1):
+    """Add (``delta=1``) or remove (``delta=-1``) one rating from a summary."""
+    await db.review_summaries.update_one(
+        {"_id": event_id},
+        {
+            "$inc": {
+                "count": delta,
+                "rating_sum": delta * rating,
+                f"histogram.{rating}": delta,
+            }
+        },
+        upsert=True,
+    )
+
+
+async def apply_reviews_to_summaries(db, reviews: list):
+    """Add many new reviews to their summaries, one upsert per event."""
+    increments = defaultdict(lambda: defaultdict(int))
+    for review in reviews:
+        inc = increments[review["event_id"]]
+        inc["count"] += 1
+        inc["rating_sum"] += review["rating"]
+        inc[f"histogram.{review['rating']}"] += 1
+    if increments:
+        await db.review_summaries.bulk_write(
+            [
+                UpdateOne({"_id": event_id}, {"$inc": dict(inc)}, upsert=True)
+                for event_id, inc in increments.items()
+            ],
+            ordered=False,
+        )
+
+
+def summary_response(event_id: str, summary: Optional[dict]) -> dict:
+    summary = summary or {}
+    count = summary.get("count", 0)
+    histogram = summary.get("histogram", {})
+    return {
+        "event_id": event_id,
+        "review_count": count,
+        "average_rating": (
+            round(summary.get("rating_sum", 0) / count, 2) if count else None
+        ),
+        "histogram": {rating: histogram.get(str(rating), 0) for rating in RATINGS},
+    }
+
+
+async def rebuild_review_summaries(db, event_id: Optional[str] = None) -> int:
+    """Recompute summaries from the reviews collection.
+
+    Rebuilds one event when ``event_id`` is given, otherwise all of them.
+    Summaries of events that no longer have reviews are removed. Returns
+    the number of summaries written.
+    """
+    rebuilt_at = datetime.now(timezone.utc)
+    match = {"event_id": event_id} if event_id else {}
+    pipeline = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {"event_id": "$event_id", "rating": "$rating"},
+                "n": {"$sum": 1},
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.event_id",
+                "count": {"$sum": "$n"},
+                "rating_sum": {"$sum": {"$multiply": ["$_id.rating", "$n"]}},
+                "buckets": {"$push": {"k": {"$toString": "$_id.rating"}, "v": "$n"}},
+            }
+        },
+        {
+            "$project": {
+                "count": 1,
+                "rating_sum": 1,
+                "histogram": {"$arrayToObject": "$buckets"},
+                "rebuilt_at": {"$literal": rebuilt_at},
+            }
+        },
+        {
+            "$merge": {
+                "into": "review_summaries",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+    await db.reviews.aggregate(pipeline).to_list(None)
+
+    # Summaries the merge did not stamp belong to events without reviews,
+    # or to events whose first review arrived after the aggregation. Keep
+    # the latter, and delete the rest only if still as read here, so an
+    # $inc from a concurrent review write is never thrown away.
+    stale = {"rebuilt_at": {"$ne": rebuilt_at}}
+    if event_id:
+        stale["_id"] = event_id
+    leftovers = await db.review_summaries.find(
+        stale, {"count": 1, "rating_sum": 1}
+    ).to_list(None)
+    if leftovers:
+        reviewed = set(
+            await db.reviews.distinct(
+                "event_id", {"event_id": {"$in": [s["_id"] for s in leftovers]}}
+            )
+        )
+        deletes = [
+            DeleteOne(
+                {
+                    **stale,
+                    "_id": summary["_id"],
+                    "count": summary.get("count"),
+                    "rating_sum": summary.get("rating_sum"),
+                }
+            )
+            for summary in leftovers
+            if summary["_id"] not in reviewed
+        ]
+        if deletes:
+            await db.review_summaries.bulk_write(deletes, ordered=False)
+    return await db.review_summaries.count_documents({"rebuilt_at": rebuilt_at})
@@ -1,15 +1,48 @@
-from typing import List
+import os
+import uuid
+from datetime import datetime
+from typing import List, Optional
 
+import psycopg
+import redis
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException
-from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
-
-from common.auth_utils import verify_token
-from common.database import get_mongo_db, get_postgresql_db
-from common.helpers import db_connection_handler
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from psycopg import sql
+
+from common import cache
+from common.auth_utils import require_admin, verify_token
+from common.conditional import (
+    event_validators,
+    is_not_modified,
+    not_modified,
+    set_validators,
+)
+from common.database import get_mongo_db, get_postgresql_db, postgresql_connection
+from common.helpers import (
+    db_connection_handler,
+    decode_cursor,
+    encode_cursor,
+    json_response,
+)
+from tickets.inventory import forget_inventory, reconcile_inventory
 
 from . import models
+from .constants import EventStatus
+from .review_ingest import REVIEW_WRITE_MODE, enqueue_review
+from .reviews import (
+    REVIEW_PROJECTION,
+    REVIEW_SORT,
+    apply_review_to_summary,
+    rebuild_review_summaries,
+    summary_response,
+)
+from .search import build_list_query, build_search_query
+from .status import advance_event_statuses
+
+REVIEW_PAGE_SIZE = int(os.getenv("REVIEW_PAGE_SIZE", "50"))
+REVIEW_PAGE_MAX_SIZE = int(os.getenv("REVIEW_PAGE_MAX_SIZE", "200"))
+EVENT_BATCH_MAX_SIZE = int(os.getenv("EVENT_BATCH_MAX_SIZE", "100"))
+EVENT_SEARCH_MAX_SIZE = int(os.getenv("EVENT_SEARCH_MAX_SIZE", "100"))
 
 event = APIRouter(dependencies=[Depends(verify_token)])
 
@@ -22,16 +55,18 @@ async def create_event(
     db_conn=Depends(get_postgresql_db),
 ):
     """Create a new event."""
+    try:
+        event.validate_status()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     organizer_id = user.get("user_id")
 
     query = sql.SQL(
-        """INSERT INTO events (event_name, description, location, start_time, end_time, event_date, organizer_id)
-                       VALUES (%s, %s, %s, %s, %s, %s, %s) 
-                       RETURNING event_id, event_name, description, location, start_time, end_time, event_date, organizer_id,created_at,updated_at;"""
+        """INSERT INTO events (event_name, description, location, start_time, end_time, event_date, capacity, organizer_id, status)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) 
+                       RETURNING event_id, event_name, description, location, start_time, end_time, event_date, capacity, organizer_id, status, created_at, updated_at;"""
     )
-    db_conn.cursor = db_conn.connection.cursor(cursor_factory=RealDictCursor)
-
-    db_conn.cursor.execute(
+    await db_conn.cursor.execute(
         query,
         (
             event.event_name,
@@ -40,52 +75,195 @@ async def create_event(
             event.start_time,
             event.end_time,
             event.event_date,
+            event.capacity,
             organizer_id,
+            event.status,
         ),
     )
-    event_data = db_conn.cursor.fetchone()
-    db_conn.connection.commit()
-    return models.EventResponse(**event_data)
+    event_data = await db_conn.cursor.fetchone()
+    await db_conn.connection.commit()
+    await cache.invalidate_event()
+    return event_data
 
 
 @event.get("/", response_model=list[models.EventResponse])
 @db_connection_handler
 async def read_events(
-    skip: int = 0, limit: int = 10, db_conn=Depends(get_postgresql_db)
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """Get all events ordered by (event_date, event_id).
+
+    Pass the ``X-Next-Cursor`` header of a full page back as ``cursor`` to
+    fetch the next one by keyset instead of ``skip``; ``skip`` is ignored
+    when a cursor is given. ``status`` (e.g. ``UPCOMING``) keeps only events
+    in that state. Pages are served from the Redis cache when possible, and
+    answered with 304 when the client's ETag still matches.
+    """
+    if status and status not in EventStatus.values():
+        raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
+    keyset = None
+    if cursor:
+        try:
+            event_date, event_id = decode_cursor(cursor)
+            keyset = (datetime.fromisoformat(event_date), event_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        cache_key = cache.event_list_key("cursor", cursor, limit, status or "all")
+    else:
+        cache_key = cache.event_list_key("offset", skip, limit, status or "all")
+    query, params = build_list_query(status, keyset, limit, skip)
+
+    async def load_events():
+        async with postgresql_connection() as db_conn:
+            # Execute the query with pagination
+            await db_conn.cursor.execute(query, params)
+            return await db_conn.cursor.fetchall()
+
+    events = await cache.read_through(
+        cache_key,
+        cache.EVENT_LIST_CACHE_TTL,
+        load_events,
+        index_key=cache.EVENT_LIST_INDEX_KEY,
+    )
+
+    etag, last_modified = event_validators(events)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    response = json_response(models.EventList, events)
+    set_validators(response, etag, last_modified)
+    if events and len(events) == limit:
+        last = events[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            last["event_date"], last["event_id"]
+        )
+    return response
+
+
+# Declared before /{event_id} so "search" is not taken for an event id.
+@event.get("/search", response_model=List[models.EventSearchResult])
+@db_connection_handler
+async def search_events(
+    q: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    status: Optional[List[str]] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=EVENT_SEARCH_MAX_SIZE),
+    db_conn=Depends(get_postgresql_db),
 ):
-    """Get all events."""
+    """Search events by text, date range (``date_to`` exclusive) and status.
+
+    ``q`` matches event name, location and description, supports web
+    search syntax ("exact phrase", -word, or) and orders results by
+    relevance. Without ``q`` results are ordered by date.
+    """
+    if status:
+        invalid = sorted(set(status) - set(EventStatus.values()))
+        if invalid:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid status: {', '.join(invalid)}"
+            )
+    query, params = build_search_query(
+        q.strip() if q else None, date_from, date_to, status, limit, skip
+    )
+    await db_conn.cursor.execute(query, params)
+    return await db_conn.cursor.fetchall()
+
+
+# Declared before /{event_id} so "batch" is not taken for an event id.
+@event.get("/batch", response_model=models.EventBatchResponse)
+@db_connection_handler
+async def read_events_batch(ids: List[str] = Query(...)):
+    """Get several events in one call, e.g. for a user's ticket list.
+
+    Accepts ``ids=1&ids=2`` or ``ids=1,2``. Events come back in the order
+    requested (duplicates dropped); ids with no event, or that are not
+    UUIDs, are listed in ``missing`` as given. Cached events are read with
+    one MGET and the rest with one ``ANY`` query.
+    """
+    requested = list(
+        dict.fromkeys(i.strip() for value in ids for i in value.split(",") if i.strip())
+    )
+    if not requested:
+        raise HTTPException(status_code=400, detail="No event ids given")
+    if len(requested) > EVENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {EVENT_BATCH_MAX_SIZE} events",
+        )
+    # Rows and cache keys use the canonical str(UUID), so "A1..." finds the
+    # same event as "a1..."; the first spelling of each id is reported back.
+    event_ids, invalid = {}, []
+    for i in requested:
+        try:
+            event_ids.setdefault(str(uuid.UUID(i)), i)
+        except ValueError:
+            invalid.append(i)
+
     query = sql.SQL(
-        """SELECT event_id, event_name, description, location, start_time, end_time, event_date, organizer_id, created_at, updated_at
-                       FROM events
-                       LIMIT %s OFFSET %s;"""
+        """SELECT event_id, event_name, description, location, start_time, end_time, event_date, capacity, organizer_id, status, created_at, updated_at
+                       FROM events WHERE event_id = ANY(%s);"""
     )
 
-    db_conn.cursor = db_conn.connection.cursor(cursor_factory=RealDictCursor)
+    async def load_events(missing_ids):
+        async with postgresql_connection() as db_conn:
+            await db_conn.cursor.execute(query, (missing_ids,))
+            rows = await db_conn.cursor.fetchall()
+        return {str(row["event_id"]): row for row in rows}
+
+    events = {}
+    if event_ids:
+        events = await cache.read_through_many(
+            {event_id: cache.event_key(event_id) for event_id in event_ids},
+            cache.EVENT_CACHE_TTL,
+            load_events,
+        )
+    return {
+        "events": [events[i] for i in event_ids if i in events],
+        "missing": [given for i, given in event_ids.items() if i not in events]
+        + invalid,
+    }
 
-    # Execute the query with pagination
-    db_conn.cursor.execute(query, (limit, skip))
-    events = db_conn.cursor.fetchall()
 
-    return [models.EventResponse(**event) for event in events]
+@event.post("/statuses:advance", dependencies=[Depends(require_admin)])
+@db_connection_handler
+async def advance_statuses():
+    """Start and complete due events now instead of waiting for the scheduler."""
+    counts = await advance_event_statuses()
+    return {"message": "Event statuses advanced", **counts}
 
 
 @event.get("/{event_id}", response_model=models.EventResponse)
 @db_connection_handler
-async def read_event(event_id: str, db_conn=Depends(get_postgresql_db)):
+async def read_event(event_id: str, request: Request, response: Response):
+    """Get one event; 304 when the client's ETag or date is still current."""
     query = sql.SQL(
-        """SELECT event_id, event_name, description, location, start_time, end_time, event_date, organizer_id, created_at, updated_at
+        """SELECT event_id, event_name, description, location, start_time, end_time, event_date, capacity, organizer_id, status, created_at, updated_at
                        FROM events WHERE event_id = %s;"""
     )
 
-    db_conn.cursor = db_conn.connection.cursor(cursor_factory=RealDictCursor)
-    db_conn.cursor.execute(query, (event_id,))
+    async def load_event():
+        async with postgresql_connection() as db_conn:
+            await db_conn.cursor.execute(query, (event_id,))
+            return await db_conn.cursor.fetchone()
 
-    event = db_conn.cursor.fetchone()
+    event = await cache.read_through(
+        cache.event_key(event_id), cache.EVENT_CACHE_TTL, load_event
+    )
     # If no event is found, raise a 404 HTTPException
     if event is None:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    return models.EventResponse(**event)
+    etag, last_modified = event_validators([event])
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    return event
 
 
 @event.put("/{event_id}", response_model=models.EventResponse)
@@ -94,16 +272,19 @@ async def update_event(
     event_id: str, event: models.EventUpdate, db_conn=Depends(get_postgresql_db)
 ):
     """Update a specific event."""
+    try:
+        event.validate_status()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     query = sql.SQL(
         """UPDATE events
-                       SET event_name = %s, description = %s, location = %s, start_time = %s, end_time = %s, event_date = %s
+                       SET event_name = %s, description = %s, location = %s, start_time = %s, end_time = %s, event_date = %s, capacity = COALESCE(%s, capacity), status = COALESCE(%s, status), updated_at = NOW()
                        WHERE event_id = %s
-                       RETURNING event_id, event_name, description, location, start_time, end_time, event_date, organizer_id, created_at, updated_at;"""
+                       RETURNING event_id, event_name, description, location, start_time, end_time, event_date, capacity, organizer_id, status, created_at, updated_at;"""
     )
 
-    db_conn.cursor = db_conn.connection.cursor(cursor_factory=RealDictCursor)
-    db_conn.cursor.execute(
+    await db_conn.cursor.execute(
         query,
         (
             event.event_name,
@@ -112,33 +293,44 @@ async def update_event(
             event.start_time,
             event.end_time,
             event.event_date,
+            event.capacity,
+            event.status,
             event_id,
         ),
     )
 
-    updated_event = db_conn.cursor.fetchone()
+    updated_event = await db_conn.cursor.fetchone()
 
     # If no event was updated, raise a 404 HTTPException
     if updated_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
+    await db_conn.connection.commit()
+    await cache.invalidate_event(event_id)
+    if event.capacity is not None:
+        try:
+            await reconcile_inventory(updated_event["event_id"])
+        except (redis.RedisError, psycopg.Error) as e:
+            # The update is committed; the next reconciliation catches up.
+            print(f"Inventory reconcile failed: {e}")
 
-    return models.EventResponse(**updated_event)
+    return updated_event
 
 
 @event.delete("/{event_id}")
 @db_connection_handler
 async def delete_event(event_id: str, db_conn=Depends(get_postgresql_db)):
     """Delete a specific event."""
-    # TODO: Delete is not working
     query = sql.SQL("""DELETE FROM events WHERE event_id = %s RETURNING event_id;""")
 
-    db_conn.cursor = db_conn.connection.cursor(cursor_factory=RealDictCursor)
-    db_conn.cursor.execute(query, (event_id,))
-    deleted_event = db_conn.cursor.fetchone()
+    await db_conn.cursor.execute(query, (event_id,))
+    deleted_event = await db_conn.cursor.fetchone()
 
     # If no event was deleted, raise a 404 HTTPException
     if deleted_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
+    await db_conn.connection.commit()
+    await cache.invalidate_event(event_id)
+    await forget_inventory(deleted_event["event_id"])
 
     return {"message": "Event deleted successfully"}
 
@@ -148,10 +340,15 @@ async def delete_event(event_id: str, db_conn=Depends(get_postgresql_db)):
 async def create_review(
     event_id: str,
     review: models.ReviewCreate,
+    response: Response,
     user: dict = Depends(verify_token),
     db=Depends(get_mongo_db),
 ):
-    """Add a review for a specific event."""
+    """Add a review for a specific event.
+
+    With ``REVIEW_WRITE_MODE=stream`` the review is queued and answered
+    with 202; it shows up in listings and the summary once written.
+    """
     user_id = user.get("user_id")
     review_data = {
         "event_id": event_id,
@@ -160,26 +357,79 @@ async def create_review(
         "comment": review.comment,
         "created_at": review.created_at,
     }
-    result = db.reviews.insert_one(review_data)
+    if REVIEW_WRITE_MODE == "stream":
+        await enqueue_review(review_data)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return review_data
+    result = await db.reviews.insert_one(review_data)
+    await apply_review_to_summary(db, event_id, review.rating)
     review_data["_id"] = str(result.inserted_id)
     return review_data
 
 
 @event.get("/{event_id}/reviews", response_model=List[models.ReviewResponse])
 @db_connection_handler
-async def get_reviews_by_event(event_id: str, db=Depends(get_mongo_db)):
-    """Get all reviews for a specific event."""
-    reviews = list(db.reviews.find({"event_id": event_id}))
-    for review in reviews:
-        review["_id"] = str(review["_id"])
-    return reviews
+async def get_reviews_by_event(
+    event_id: str,
+    after: Optional[str] = None,
+    limit: int = Query(REVIEW_PAGE_SIZE, ge=1, le=REVIEW_PAGE_MAX_SIZE),
+    db=Depends(get_mongo_db),
+):
+    """Get reviews for a specific event, oldest first.
+
+    A full page carries an ``X-Next-Cursor`` header; pass it back as
+    ``after`` to get the next page.
+    """
+    query = {"event_id": event_id}
+    if after:
+        anchor = None
+        if ObjectId.is_valid(after):
+            anchor = await db.reviews.find_one(
+                {"_id": ObjectId(after), "event_id": event_id}, {"created_at": 1}
+            )
+        if anchor is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["$or"] = [
+            {"created_at": {"$gt": anchor["created_at"]}},
+            {"created_at": anchor["created_at"], "_id": {"$gt": anchor["_id"]}},
+        ]
+
+    reviews = (
+        await db.reviews.find(query, REVIEW_PROJECTION)
+        .sort(REVIEW_SORT)
+        .limit(limit)
+        .to_list(limit)
+    )
+    response = json_response(models.ReviewList, reviews)
+    if len(reviews) == limit:
+        response.headers["X-Next-Cursor"] = str(reviews[-1]["_id"])
+    return response
+
+
+@event.get("/{event_id}/reviews/summary", response_model=models.ReviewSummary)
+@db_connection_handler
+async def get_review_summary(event_id: str, db=Depends(get_mongo_db)):
+    """Get the review count, average rating and histogram for an event."""
+    summary = await db.review_summaries.find_one({"_id": event_id})
+    return summary_response(event_id, summary)
+
+
+@event.post("/reviews/summaries:rebuild", dependencies=[Depends(require_admin)])
+@db_connection_handler
+async def rebuild_summaries(event_id: Optional[str] = None, db=Depends(get_mongo_db)):
+    """Recompute review summaries from the reviews, for one event or all."""
+    rebuilt = await rebuild_review_summaries(db, event_id)
+    return {"message": "Review summaries rebuilt", "summaries": rebuilt}
 
 
 @event.delete("/reviews/{review_id}")
 @db_connection_handler
 async def delete_review(review_id: str, db=Depends(get_mongo_db)):
     """Delete a specific review."""
-    result = db.reviews.delete_one({"_id": ObjectId(review_id)})
-    if result.deleted_count == 0:
+    review = await db.reviews.find_one_and_delete(
+        {"_id": ObjectId(review_id)}, projection={"event_id": 1, "rating": 1}
+    )
+    if review is None:
         raise HTTPException(status_code=404, detail="Review not found")
+    await apply_review_to_summary(db, review["event_id"], review["rating"], -1)
     return {"message": "Review deleted successfully"}
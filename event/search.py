@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import List, Optional
+
+from psycopg import sql
+
+# Generated column indexed by idx_events_search (migrations/003).
+SEARCH_VECTOR = sql.Identifier("search_vector")
+
+EVENT_COLUMNS = sql.SQL(
+    "event_id, event_name, description, location, start_time, end_time, "
+    "event_date, capacity, organizer_id, status, created_at, updated_at"
+)
+
+
+def build_list_query(
+    status: Optional[str],
+    keyset: Optional[tuple],
+    limit: int,
+    skip: int,
+) -> tuple[sql.Composed, list]:
+    """Build the ``GET /event/`` statement and its parameters.
+
+    Pages by ``keyset`` (the last ``(event_date, event_id)`` seen) when
+    given, otherwise by ``skip``.
+    """
+    conditions, params = [], []
+    if status:
+        # With the status equality first, the (status, event_date, event_id)
+        # index serves both the ordering and the keyset seek.
+        conditions.append(sql.SQL("status = %s"))
+        params.append(status)
+    if keyset:
+        conditions.append(sql.SQL("(event_date, event_id) > (%s, %s)"))
+        params.extend([*keyset, limit])
+        pagination = sql.SQL("LIMIT %s")
+    else:
+        params.extend([limit, skip])
+        pagination = sql.SQL("LIMIT %s OFFSET %s")
+
+    where = (
+        sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions)
+        if conditions
+        else sql.SQL("")
+    )
+    query = sql.SQL(
+        """SELECT {columns}
+           FROM events
+           {where}
+           ORDER BY event_date, event_id
+           {pagination};"""
+    ).format(columns=EVENT_COLUMNS, where=where, pagination=pagination)
+    return query, params
+
+
+def build_search_query(
+    q: Optional[str],
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    statuses: Optional[List[str]],
+    limit: int,
+    skip: int,
+) -> tuple[sql.Composed, list]:
+    """Build the event search statement and its parameters.
+
+    ``q`` is parsed with websearch_to_tsquery ("quoted phrases", -exclude,
+    or). With a query, results are ordered by rank, otherwise by date.
+    ``date_to`` is exclusive.
+    """
+    conditions, params = [], []
+    if q:
+        # Inline (not a FROM item) so the planner sees the query terms
+        # and can estimate how selective they are.
+        conditions.append(
+            sql.SQL("{} @@ websearch_to_tsquery('english', %s)").format(SEARCH_VECTOR)
+        )
+        params.append(q)
+    if date_from:
+        conditions.append(sql.SQL("event_date >= %s"))
+        params.append(date_from)
+    if date_to:
+        conditions.append(sql.SQL("event_date < %s"))
+        params.append(date_to)
+    if statuses:
+        conditions.append(sql.SQL("status = ANY(%s)"))
+        params.append(statuses)
+
+    where = (
+        sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions)
+        if conditions
+        else sql.SQL("")
+    )
+    if q:
+        query = sql.SQL(
+            """SELECT {columns}, ts_rank({vector}, websearch_to_tsquery('english', %s)) AS rank
+               FROM events
+               {where}
+               ORDER BY rank DESC, event_date, event_id
+               LIMIT %s OFFSET %s;"""
+        ).format(columns=EVENT_COLUMNS, vector=SEARCH_VECTOR, where=where)
+        params.insert(0, q)
+    else:
+        query = sql.SQL(
+            """SELECT {columns}, NULL::real AS rank
+               FROM events
+               {where}
+               ORDER BY event_date, event_id
+               LIMIT %s OFFSET %s;"""
+        ).format(columns=EVENT_COLUMNS, where=where)
+    params.extend([limit, skip])
+    return query, params
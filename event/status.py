@@ -0,0 +1,79 @@
+import os
+
+from psycopg import sql
+
+from common import cache
+from common.database import postgresql_connection
+
+from .constants import EventStatus
+
+# Statuses move forward in bulk on a schedule rather than being derived per
+# row on every read. starts_at/ends_at and the partial indexes that serve
+# these statements come from migrations/004.
+EVENT_STATUS_INTERVAL = int(os.getenv("EVENT_STATUS_INTERVAL", "60"))
+EVENT_STATUS_BATCH_SIZE = int(os.getenv("EVENT_STATUS_BATCH_SIZE", "1000"))
+
+# Each statement takes up to a batch of due events in time order from its
+# partial index, then updates them by primary key (ARRAY() keeps the planner
+# from joining the batch against the whole table). One worker at a time
+# runs the scheduler (run_periodically's Redis lock). Should a run outlast
+# the lock, or the admin route run it alongside, SKIP LOCKED keeps the runs
+# off each other's rows and each statement re-checks the status it moves
+# from, so no event is moved twice. Rows someone is editing are skipped
+# and picked up by the next run. Statuses are inlined, not parameters, so the
+# planner can match the partial index predicates. An event whose end already
+# passed (the scheduler was down) goes straight to COMPLETED.
+START_EVENTS = sql.SQL(
+    """UPDATE events
+       SET status = CASE WHEN ends_at <= now() THEN {completed} ELSE {ongoing} END,
+           updated_at = now()
+       WHERE event_id = ANY(ARRAY(
+           SELECT event_id FROM events
+           WHERE status = {upcoming} AND starts_at <= now()
+           ORDER BY starts_at
+           LIMIT %s
+           FOR UPDATE SKIP LOCKED))
+       RETURNING event_id;"""
+).format(
+    upcoming=sql.Literal(EventStatus.UPCOMING),
+    ongoing=sql.Literal(EventStatus.ONGOING),
+    completed=sql.Literal(EventStatus.COMPLETED),
+)
+END_EVENTS = sql.SQL(
+    """UPDATE events
+       SET status = {completed}, updated_at = now()
+       WHERE event_id = ANY(ARRAY(
+           SELECT event_id FROM events
+           WHERE status = {ongoing} AND ends_at <= now()
+           ORDER BY ends_at
+           LIMIT %s
+           FOR UPDATE SKIP LOCKED))
+       RETURNING event_id;"""
+).format(
+    ongoing=sql.Literal(EventStatus.ONGOING),
+    completed=sql.Literal(EventStatus.COMPLETED),
+)
+
+
+async def advance_event_statuses() -> dict:
+    """Start and complete every event whose time has come.
+
+    Runs batches of EVENT_STATUS_BATCH_SIZE, each committed on its own so
+    row locks stay short, until nothing is due. Changed events get a new
+    ``updated_at`` (and so a new ETag) and are dropped from the cache.
+    Returns how many events started and how many ended.
+    """
+    counts, changed = {"started": 0, "ended": 0}, []
+    async with postgresql_connection() as db_conn:
+        for name, query in (("started", START_EVENTS), ("ended", END_EVENTS)):
+            while True:
+                await db_conn.cursor.execute(query, (EVENT_STATUS_BATCH_SIZE,))
+                rows = await db_conn.cursor.fetchall()
+                await db_conn.connection.commit()
+                changed.extend(row["event_id"] for row in rows)
+                counts[name] += len(rows)
+                if len(rows) < EVENT_STATUS_BATCH_SIZE:
+                    break
+    if changed:
+        await cache.invalidate_event(*changed)
+    return counts
@@ -1,14 +1,174 @@
+import argparse
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import ORJSONResponse
 
+from auth.hashing import get_hashing_stats, shutdown_hashing
 from auth.routes import auth
+from common.auth_utils import get_token_cache_stats
+from common.cache import get_cache_stats
+from common.database import (
+    MongoDBConnection,
+    PostgresPool,
+    RedisConnection,
+    get_pool_stats,
+)
+from common.health import check_backends
+from common.helpers import run_periodically
+from common.metrics import (
+    MetricsMiddleware,
+    clear_multiprocess_metrics,
+    mark_worker_stopped,
+    render_metrics,
+)
+from event.review_ingest import (
+    REVIEW_WRITE_MODE,
+    drain_review_stream,
+    ensure_review_stream,
+)
+from event.reviews import ensure_review_indexes
 from event.routes import event
+from event.status import EVENT_STATUS_INTERVAL, advance_event_statuses
+from tickets.inventory import INVENTORY_RECONCILE_INTERVAL, reconcile_inventory
 from tickets.routes import ticket
 
-app = FastAPI()
+# Worker processes for ``python main.py``; 0 runs the auto-reloading dev
+# server instead. uvicorn's own CLI reads the same variable.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))
+# Seconds a stopping worker gives in-flight requests before closing them.
+GRACEFUL_SHUTDOWN_TIMEOUT = float(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    postgres_pool = PostgresPool()
+    redis_conn = RedisConnection()
+    mongo_conn = MongoDBConnection()
+    # Connect all three at once; the worker only takes traffic (and reports
+    # ready) once every backend answered.
+    await asyncio.gather(
+        postgres_pool.open(), redis_conn.connect(), mongo_conn.connect()
+    )
+    await ensure_review_indexes(mongo_conn.db)
+    tasks = []
+    if INVENTORY_RECONCILE_INTERVAL > 0:
+        tasks.append(
+            asyncio.create_task(
+                run_periodically(
+                    INVENTORY_RECONCILE_INTERVAL, reconcile_inventory, exclusive=True
+                )
+            )
+        )
+    if EVENT_STATUS_INTERVAL > 0:
+        tasks.append(
+            asyncio.create_task(
+                run_periodically(
+                    EVENT_STATUS_INTERVAL, advance_event_statuses, exclusive=True
+                )
+            )
+        )
+    if REVIEW_WRITE_MODE == "stream":
+        await ensure_review_stream(redis_conn.connection)
+        tasks.append(asyncio.create_task(drain_review_stream()))
+    app.state.ready = True
+    yield
+    # Fail readiness first so the load balancer stops routing here.
+    app.state.ready = False
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    mongo_conn.close()
+    await redis_conn.close()
+    shutdown_hashing()
+    await postgres_pool.close()
+    mark_worker_stopped()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.state.ready = False
+app.add_middleware(MetricsMiddleware, router_app=app)
 app.include_router(auth, prefix="/auth", tags=["auth"])
 app.include_router(event, prefix="/event", tags=["event"])
 app.include_router(ticket, prefix="/tickets", tags=["tickets"])
 
+
+@app.get("/stats", tags=["stats"])
+def read_stats():
+    """Per-worker runtime stats used to size connection pools."""
+    return {
+        "postgres_pool": get_pool_stats(),
+        "event_cache": get_cache_stats(),
+        "password_hashing": get_hashing_stats(),
+        "token_cache": get_token_cache_stats(),
+    }
+
+
+@app.get("/metrics", tags=["stats"])
+def read_metrics():
+    """Request and database metrics in Prometheus format.
+
+    Per worker, or across all workers when PROMETHEUS_MULTIPROC_DIR is set.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/healthz", tags=["health"])
+async def read_health():
+    """Liveness: the worker is up. Backend status is informational only."""
+    return {"status": "ok", "backends": await check_backends()}
+
+
+@app.get("/readyz", tags=["health"])
+async def read_readiness(request: Request, response: Response):
+    """Readiness: startup finished and every backend answers a ping."""
+    backends = await check_backends()
+    ready = request.app.state.ready and all(
+        backend["status"] == "up" for backend in backends.values()
+    )
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "not ready", "backends": backends}
+
+
+def serve(workers: int, host: str, port: int, app_path: str = "main:app"):
+    """Serve ``app_path`` from ``workers`` processes behind one socket.
+
+    With two or more workers uvicorn's supervisor spawns each one as a fresh
+    interpreter, so no connection is shared across processes: every worker
+    imports the app and opens its own pools in the lifespan. The supervisor
+    restarts workers that die, and on SIGHUP replaces them one at a time,
+    each old worker finishing its in-flight requests first while the rest
+    keep serving. SIGTTIN and SIGTTOU add and remove a worker. SIGINT and
+    SIGTERM drain every worker and exit. A single worker runs without the
+    supervisor; leave restarts to the process manager.
+    """
+    clear_multiprocess_metrics()
+    uvicorn.run(
+        app_path,
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
+
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="localhost", port=8000, reload=True)
+    parser = argparse.ArgumentParser(description="Run the API server.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WEB_CONCURRENCY,
+        help="worker processes for production; 0 runs the dev server with reload",
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    if args.workers > 0:
+        serve(args.workers, args.host, args.port)
+    else:
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True)
@@ -0,0 +1,3 @@
+-- Keyset pagination for GET /event/ orders and seeks on (event_date, event_id).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_events_event_date_event_id
+    ON events (event_date, event_id);
@@ -0,0 +1,8 @@
+-- Seat limit per event; NULL means unlimited. Ticket sales reserve seats
+-- against a Redis counter derived from this and the tickets already sold.
+ALTER TABLE events
+    ADD COLUMN IF NOT EXISTS capacity INTEGER CHECK (capacity IS NULL OR capacity >= 0);
+
+-- Counting sold tickets per event (inventory initialization and
+-- reconciliation) and listing an event's tickets.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tickets_event_id ON tickets (event_id);
@@ -0,0 +1,14 @@
+-- Full-text search for GET /event/search. The vector is stored so ranking
+-- reads it instead of re-parsing every matching row; name matches rank
+-- above location, location above description. Adding a stored column
+-- rewrites the table under an exclusive lock, so run this off-peak.
+ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(event_name, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(location, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED;
+
+-- Date ranges are served by idx_events_event_date_event_id (001).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_events_search
+    ON events USING GIN (search_vector);
@@ -0,0 +1,53 @@
+-- Lifecycle status, moved forward by the scheduler in event/status.py as
+-- events start and end.
+ALTER TABLE events
+    ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'UPCOMING'
+        CHECK (status IN ('UPCOMING', 'ONGOING', 'COMPLETED'));
+
+-- The generated columns below need an immutable expression, and
+-- "event_date AT TIME ZONE 'UTC'" is only that for a timestamptz. A naive
+-- timestamp event_date is taken to be UTC and converted first, rewriting
+-- the table; any other type stops the migration.
+DO $$
+DECLARE
+    event_date_type regtype := (
+        SELECT atttypid::regtype FROM pg_attribute
+        WHERE attrelid = 'events'::regclass AND attname = 'event_date'
+    );
+BEGIN
+    IF event_date_type = 'timestamp without time zone'::regtype THEN
+        ALTER TABLE events ALTER COLUMN event_date TYPE TIMESTAMPTZ
+            USING event_date AT TIME ZONE 'UTC';
+    ELSIF event_date_type <> 'timestamp with time zone'::regtype THEN
+        RAISE EXCEPTION 'events.event_date is %, expected timestamptz',
+            event_date_type;
+    END IF;
+END
+$$;
+
+-- When an event starts and ends: start_time and end_time on the (UTC) day of
+-- event_date. An end_time not after start_time runs past midnight. Adding
+-- stored columns rewrites the table once.
+ALTER TABLE events
+    ADD COLUMN IF NOT EXISTS starts_at TIMESTAMPTZ GENERATED ALWAYS AS (
+        (date_trunc('day', event_date AT TIME ZONE 'UTC') + start_time)
+            AT TIME ZONE 'UTC'
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS ends_at TIMESTAMPTZ GENERATED ALWAYS AS (
+        (date_trunc('day', event_date AT TIME ZONE 'UTC') + end_time
+            + CASE WHEN end_time <= start_time THEN interval '1 day'
+                   ELSE interval '0' END)
+            AT TIME ZONE 'UTC'
+    ) STORED;
+
+-- The scheduler's due events, in time order. Each index only holds the
+-- events still waiting for that transition, so it stays small however many
+-- completed events pile up.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_events_upcoming_starts_at
+    ON events (starts_at) WHERE status = 'UPCOMING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_events_ongoing_ends_at
+    ON events (ends_at) WHERE status = 'ONGOING';
+
+-- GET /event/?status= filters on status and pages on (event_date, event_id).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_events_status_event_date_event_id
+    ON events (status, event_date, event_id);
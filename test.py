@@ -1,3 +1,14 @@
-from auth.routes import DatabaseConnection
+import asyncio
 
-db_conn = DatabaseConnection()
+from common.database import PostgresPool
+
+
+async def check_connection():
+    postgres_pool = PostgresPool()
+    await postgres_pool.open()
+    async with postgres_pool.pool.connection() as connection:
+        await connection.execute("SELECT 1")
+    await postgres_pool.close()
+
+
+asyncio.run(check_connection())
@@ -0,0 +1,257 @@
+import os
+
+import psycopg
+import redis
+from fastapi import HTTPException, status
+
+from common.database import RedisConnection, postgresql_connection
+
+# Seats left per event live in Redis so that concurrent sales for one event
+# reserve with a single atomic script instead of queueing on a Postgres row
+# lock. The tickets table stays the source of truth; reconcile_inventory
+# re-derives the counters from it.
+INVENTORY_RECONCILE_INTERVAL = int(os.getenv("INVENTORY_RECONCILE_INTERVAL", "600"))
+# Seconds the pending bookkeeping of an event outlives its last sale or
+# release. Must exceed the longest purchase; a crashed worker's holds are
+# dropped once the event is this long without one.
+INVENTORY_PENDING_TTL = int(os.getenv("INVENTORY_PENDING_TTL", "300"))
+UNLIMITED = "unlimited"
+
+# Next to each counter a hash tracks what the tickets table cannot show yet:
+# "held" seats reserved by purchases not committed or rolled back,
+# "releasing" tickets being deleted whose seats are not given back yet, and
+# a "version" every change bumps, so that the reconciler can tell whether
+# its snapshot of the table is still current.
+
+# Returns the seats left after reserving ARGV[1], or -1 if there are not
+# enough, -2 if the counter is not initialized, -3 if the event is uncapped.
+RESERVE_SCRIPT = """
+local remaining = redis.call('GET', KEYS[1])
+if not remaining then return -2 end
+if remaining == ARGV[2] then return -3 end
+if tonumber(remaining) < tonumber(ARGV[1]) then return -1 end
+redis.call('HINCRBY', KEYS[2], 'held', ARGV[1])
+redis.call('HINCRBY', KEYS[2], 'version', 1)
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return redis.call('DECRBY', KEYS[1], ARGV[1])
+"""
+
+# Adds ARGV[2] to the pending field ARGV[1] and, when ARGV[3] is '1', gives
+# ARGV[4] seats back, leaving missing or uncapped counters alone.
+PENDING_SCRIPT = """
+redis.call('HINCRBY', KEYS[2], ARGV[1], ARGV[2])
+redis.call('HINCRBY', KEYS[2], 'version', 1)
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+local remaining = redis.call('GET', KEYS[1])
+if ARGV[3] ~= '1' or not remaining or remaining == ARGV[5] then return -3 end
+return redis.call('INCRBY', KEYS[1], ARGV[4])
+"""
+
+# Sets the counter to ARGV[2] (capacity minus sold) less the seats held,
+# unless the version moved past ARGV[1] since the table was read or a
+# release is in flight. Returns 1 when written, 0 when skipped.
+RECONCILE_SCRIPT = """
+local version, held, releasing = unpack(
+  redis.call('HMGET', KEYS[2], 'version', 'held', 'releasing'))
+if (version or '0') ~= ARGV[1] then return 0 end
+if tonumber(releasing or '0') > 0 then return 0 end
+local remaining = tonumber(ARGV[2]) - math.max(tonumber(held or '0'), 0)
+redis.call('SET', KEYS[1], math.max(remaining, 0))
+return 1
+"""
+
+CAPACITY_QUERY = """
+    SELECT e.capacity,
+           (SELECT COUNT(*) FROM tickets t WHERE t.event_id = e.event_id) AS sold
+    FROM events e WHERE e.event_id = %s;
+"""
+
+
+# Keys use the canonical str(UUID) form, as the uuid loader returns it, so
+# ticket routes (uuid.UUID path ids), event routes (ids read back from
+# the row) and the reconciler all address the same counter.
+def inventory_key(event_id) -> str:
+    return f"inventory:event:{event_id}"
+
+
+def pending_key(event_id) -> str:
+    return f"inventory:event:{event_id}:pending"
+
+
+def _remaining(capacity, sold) -> str:
+    return UNLIMITED if capacity is None else str(max(capacity - sold, 0))
+
+
+async def _initialize(redis_client, db, event_id):
+    try:
+        await db.cursor.execute(CAPACITY_QUERY, (event_id,))
+        row = await db.cursor.fetchone()
+    except psycopg.Error as e:
+        await db.connection.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to load ticket inventory: {e}",
+        )
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
+        )
+    # NX: a concurrent request may have initialized (and reserved) already.
+    await redis_client.set(
+        inventory_key(event_id), _remaining(row["capacity"], row["sold"]), nx=True
+    )
+
+
+async def _update_pending(event_id, field: str, delta: int, give_back: int = 0):
+    redis_client = RedisConnection().connection
+    update = redis_client.register_script(PENDING_SCRIPT)
+    await update(
+        keys=[inventory_key(event_id), pending_key(event_id)],
+        args=[
+            field,
+            delta,
+            int(give_back > 0),
+            give_back,
+            UNLIMITED,
+            INVENTORY_PENDING_TTL,
+        ],
+    )
+
+
+async def reserve_tickets(event_id, quantity: int, db) -> bool:
+    """Atomically take ``quantity`` seats before the tickets are inserted.
+
+    Returns True when seats were taken and held, to be settled with
+    confirm_tickets or release_tickets, and False for uncapped events.
+    Raises 409 when sold out.
+    """
+    redis_client = RedisConnection().connection
+    reserve = redis_client.register_script(RESERVE_SCRIPT)
+    keys = [inventory_key(event_id), pending_key(event_id)]
+    args = [quantity, UNLIMITED, INVENTORY_PENDING_TTL]
+    try:
+        result = await reserve(keys=keys, args=args)
+        if result == -2:
+            await _initialize(redis_client, db, event_id)
+            result = await reserve(keys=keys, args=args)
+    except redis.RedisError as e:
+        print(f"Inventory reservation failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ticket inventory unavailable",
+        )
+    if result == -1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Not enough tickets left"
+        )
+    return result != -3
+
+
+async def confirm_tickets(event_id, quantity: int):
+    """Drop the hold on reserved seats once their tickets are committed."""
+    try:
+        await _update_pending(event_id, "held", -quantity)
+    except redis.RedisError as e:
+        # The seats stay held, so never oversold, until the hold expires.
+        print(f"Inventory confirmation failed: {e}")
+
+
+async def release_tickets(event_id, quantity: int):
+    """Give reserved seats back after a failed insert."""
+    try:
+        await _update_pending(event_id, "held", -quantity, give_back=quantity)
+    except redis.RedisError as e:
+        # The next reconciliation corrects the counter.
+        print(f"Inventory release failed: {e}")
+
+
+async def begin_ticket_return(event_id, quantity: int) -> bool:
+    """Announce that ``quantity`` deleted tickets are about to commit.
+
+    Call after the DELETE and before the commit; the reconciler leaves the
+    counter alone until end_ticket_return. Returns False if Redis failed,
+    in which case the seats come back at the next reconciliation instead.
+    """
+    try:
+        await _update_pending(event_id, "releasing", quantity)
+    except redis.RedisError as e:
+        print(f"Inventory release failed: {e}")
+        return False
+    return True
+
+
+async def end_ticket_return(event_id, quantity: int, returned: bool):
+    """Give the seats of deleted tickets back, or none if the delete failed."""
+    try:
+        await _update_pending(
+            event_id, "releasing", -quantity, give_back=quantity if returned else 0
+        )
+    except redis.RedisError as e:
+        # The next reconciliation corrects the counter.
+        print(f"Inventory release failed: {e}")
+
+
+async def reconcile_inventory(event_id=None) -> int:
+    """Correct inventory counters from the tickets table.
+
+    Each counter becomes capacity minus tickets sold minus seats held by
+    purchases in flight, written by a script that first checks the event's
+    version against the one read before the table. Events that sold or
+    returned seats in between are skipped until the next run, so a stale
+    count never overwrites a reservation. Returns the number of counters
+    written.
+    """
+    where = "AND e.event_id = %s" if event_id is not None else ""
+    params = (event_id,) if event_id is not None else None
+    redis_client = RedisConnection().connection
+    async with postgresql_connection() as db_conn:
+        await db_conn.cursor.execute(
+            f"SELECT e.event_id FROM events e WHERE e.capacity IS NOT NULL {where};",
+            params,
+        )
+        event_ids = [row["event_id"] for row in await db_conn.cursor.fetchall()]
+        if not event_ids:
+            if event_id is not None:
+                # The event has no capacity (or no longer exists).
+                await redis_client.delete(inventory_key(event_id))
+            return 0
+
+        # Versions first: any change after this read shows in the script.
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for id_ in event_ids:
+                pipe.hget(pending_key(id_), "version")
+            versions = dict(zip(event_ids, await pipe.execute()))
+
+        await db_conn.cursor.execute(
+            """SELECT e.event_id, e.capacity, COUNT(t.ticket_id) AS sold
+               FROM events e
+               LEFT JOIN tickets t ON t.event_id = e.event_id
+               WHERE e.event_id = ANY(%s) AND e.capacity IS NOT NULL
+               GROUP BY e.event_id, e.capacity;""",
+            (event_ids,),
+        )
+        rows = await db_conn.cursor.fetchall()
+
+    reconcile = redis_client.register_script(RECONCILE_SCRIPT)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for row in rows:
+            await reconcile(
+                keys=[inventory_key(row["event_id"]), pending_key(row["event_id"])],
+                args=[
+                    versions[row["event_id"]] or "0",
+                    row["capacity"] - row["sold"],
+                ],
+                client=pipe,
+            )
+        written = await pipe.execute()
+    return sum(written)
+
+
+async def forget_inventory(event_id):
+    """Drop the counter of a deleted event."""
+    try:
+        await RedisConnection().connection.delete(
+            inventory_key(event_id), pending_key(event_id)
+        )
+    except redis.RedisError as e:
+        print(f"Inventory cleanup failed: {e}")
@@ -1,6 +1,7 @@
 from datetime import datetime
+from typing import List
 
-from pydantic import BaseModel, condecimal
+from pydantic import BaseModel, TypeAdapter, condecimal
 
 
 class TicketCreate(BaseModel):
@@ -15,5 +16,19 @@ class TicketResponse(TicketCreate):
         from_attributes = True
 
     ticket_id: int
-    event_id: int
+    event_id: str
     purchased_at: datetime
+
+
+class TicketBatchError(BaseModel):
+    index: int  # Position of the rejected item in the request body
+    errors: List[dict]
+
+
+class TicketBatchResponse(BaseModel):
+    created: List[TicketResponse]
+    errors: List[TicketBatchError]
+
+
+# Validate and serialize whole lists at once (see common.helpers.json_response).
+TicketList = TypeAdapter(List[TicketResponse])
@@ -1,76 +1,266 @@
-from typing import List
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from psycopg import sql
+from pydantic import ValidationError
 
-from common.auth_utils import verify_token
-from common.database import get_postgresql_db
+from common.auth_utils import require_admin, verify_token
+from common.database import get_postgresql_db, postgresql_connection
+from common.helpers import json_response
 
-from .models import TicketCreate, TicketResponse
+from .inventory import (
+    begin_ticket_return,
+    confirm_tickets,
+    end_ticket_return,
+    reconcile_inventory,
+    release_tickets,
+    reserve_tickets,
+)
+from .models import TicketBatchResponse, TicketCreate, TicketList, TicketResponse
+
+TICKET_BATCH_MAX_SIZE = int(os.getenv("TICKET_BATCH_MAX_SIZE", "1000"))
+TICKET_EXPORT_CHUNK_SIZE = int(os.getenv("TICKET_EXPORT_CHUNK_SIZE", "2000"))
 
 ticket = APIRouter(dependencies=[Depends(verify_token)])
 
 
 @ticket.post("/events/{event_id}/tickets", response_model=TicketResponse)
-def create_ticket(event_id: int, ticket: TicketCreate, db=Depends(get_postgresql_db)):
+async def create_ticket(
+    event_id: uuid.UUID, ticket: TicketCreate, db=Depends(get_postgresql_db)
+):
     query = """
         INSERT INTO tickets (event_id, user_id, ticket_type, price)
         VALUES (%s, %s, %s, %s)
         RETURNING ticket_id, event_id, user_id, ticket_type, price, purchased_at;
     """
+    reserved = await reserve_tickets(event_id, 1, db)
     try:
-        db.cursor.execute(
+        await db.cursor.execute(
             query,
             (event_id, ticket.user_id, ticket.ticket_type, ticket.price),
         )
-        ticket_data = db.cursor.fetchone()
-        db.connection.commit()
-        return ticket_data
+        ticket_data = await db.cursor.fetchone()
+        await db.connection.commit()
     except Exception as e:
-        db.connection.rollback()
+        await db.connection.rollback()
+        if reserved:
+            await release_tickets(event_id, 1)
         raise HTTPException(status_code=500, detail=f"Failed to create ticket: {e}")
+    if reserved:
+        await confirm_tickets(event_id, 1)
+    return ticket_data
+
+
+@ticket.post("/events/{event_id}/tickets:batch", response_model=TicketBatchResponse)
+async def create_tickets_batch(
+    event_id: uuid.UUID,
+    # Items are TicketCreate, validated one by one below so that a bad item
+    # is reported by index instead of failing the whole request.
+    tickets: List[Any] = Body(
+        json_schema_extra={"items": {"$ref": "#/components/schemas/TicketCreate"}}
+    ),
+    db=Depends(get_postgresql_db),
+):
+    """Create many tickets in one transaction with a multi-row INSERT.
+
+    Items that fail validation are reported by index under ``errors`` and
+    skipped; the valid ones are still inserted. Seats for all valid items
+    are reserved together, so a batch that does not fit gets a 409.
+    """
+    if len(tickets) > TICKET_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {TICKET_BATCH_MAX_SIZE} tickets",
+        )
+
+    valid, errors = [], []
+    for index, item in enumerate(tickets):
+        try:
+            valid.append(TicketCreate.model_validate(item))
+        except ValidationError as e:
+            errors.append(
+                {
+                    "index": index,
+                    "errors": e.errors(include_url=False, include_context=False),
+                }
+            )
+    if not valid:
+        return {"created": [], "errors": errors}
+
+    query = sql.SQL(
+        """
+        INSERT INTO tickets (event_id, user_id, ticket_type, price)
+        VALUES {}
+        RETURNING ticket_id, event_id, user_id, ticket_type, price, purchased_at;
+    """
+    ).format(sql.SQL(", ").join(sql.SQL("(%s, %s, %s, %s)") for _ in valid))
+    params = [
+        value
+        for item in valid
+        for value in (event_id, item.user_id, item.ticket_type, item.price)
+    ]
+    reserved = await reserve_tickets(event_id, len(valid), db)
+    try:
+        await db.cursor.execute(query, params)
+        created = await db.cursor.fetchall()
+        await db.connection.commit()
+    except Exception as e:
+        await db.connection.rollback()
+        if reserved:
+            await release_tickets(event_id, len(valid))
+        raise HTTPException(status_code=500, detail=f"Failed to create tickets: {e}")
+    if reserved:
+        await confirm_tickets(event_id, len(valid))
+    return {"created": created, "errors": errors}
 
 
 @ticket.get("/users/{user_id}/tickets", response_model=List[TicketResponse])
-def get_tickets_by_user(user_id: int, db=Depends(get_postgresql_db)):
+async def get_tickets_by_user(user_id: int, db=Depends(get_postgresql_db)):
     query = """
         SELECT ticket_id, event_id, user_id, ticket_type, price, purchased_at
         FROM tickets WHERE user_id = %s;
     """
     try:
-        db.cursor.execute(query, (user_id,))
-        tickets = db.cursor.fetchall()
-        return tickets
+        await db.cursor.execute(query, (user_id,))
+        tickets = await db.cursor.fetchall()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch tickets: {e}")
+    return json_response(TicketList, tickets)
 
 
 @ticket.get("/events/{event_id}/tickets", response_model=List[TicketResponse])
-def get_tickets_by_event(event_id: int, db=Depends(get_postgresql_db)):
+async def get_tickets_by_event(event_id: uuid.UUID, db=Depends(get_postgresql_db)):
     query = """
         SELECT ticket_id, event_id, user_id, ticket_type, price, purchased_at
         FROM tickets WHERE event_id = %s;
     """
     try:
-        db.cursor.execute(query, (event_id,))
-        tickets = db.cursor.fetchall()
-        return tickets
+        await db.cursor.execute(query, (event_id,))
+        tickets = await db.cursor.fetchall()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch tickets: {e}")
+    return json_response(TicketList, tickets)
+
+
+TICKET_EXPORT_COLUMNS = (
+    "ticket_id",
+    "event_id",
+    "user_id",
+    "ticket_type",
+    "price",
+    "purchased_at",
+)
+
+
+def _export_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _encode_ndjson(rows) -> str:
+    return "".join(json.dumps(row, default=_export_default) + "\n" for row in rows)
+
+
+def _encode_csv(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TICKET_EXPORT_COLUMNS)
+    if header:
+        writer.writeheader()
+    writer.writerows(
+        {
+            column: (value.isoformat() if isinstance(value, datetime) else value)
+            for column, value in row.items()
+        }
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+async def _stream_tickets(event_id: uuid.UUID, fmt: str):
+    query = """
+        SELECT ticket_id, event_id, user_id, ticket_type, price, purchased_at
+        FROM tickets WHERE event_id = %s
+        ORDER BY ticket_id;
+    """
+    # The request's own connection is released before a streamed body is
+    # sent, so the export holds a connection of its own until it finishes.
+    async with postgresql_connection() as db_conn:
+        async with db_conn.connection.cursor(name="tickets_export") as cursor:
+            await cursor.execute(query, (event_id,))
+            if fmt == "csv":
+                yield _encode_csv([], header=True)
+            while rows := await cursor.fetchmany(TICKET_EXPORT_CHUNK_SIZE):
+                yield _encode_csv(rows) if fmt == "csv" else _encode_ndjson(rows)
+
+
+@ticket.get("/events/{event_id}/tickets/export")
+async def export_tickets_by_event(
+    event_id: uuid.UUID,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+):
+    """Stream every ticket of an event as NDJSON or CSV.
+
+    Rows are read through a server-side cursor TICKET_EXPORT_CHUNK_SIZE at a
+    time, so memory stays flat regardless of the event's size.
+    """
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_tickets(event_id, fmt),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="event-{event_id}-tickets.{fmt}"'
+            )
+        },
+    )
 
 
 @ticket.delete("/tickets/{ticket_id}")
-def delete_ticket(ticket_id: int, db=Depends(get_postgresql_db)):
-    query = "DELETE FROM tickets WHERE ticket_id = %s RETURNING ticket_id;"
+async def delete_ticket(ticket_id: int, db=Depends(get_postgresql_db)):
+    query = "DELETE FROM tickets WHERE ticket_id = %s RETURNING ticket_id, event_id;"
     try:
-        db.cursor.execute(query, (ticket_id,))
-        deleted_ticket = db.cursor.fetchone()
+        await db.cursor.execute(query, (ticket_id,))
+        deleted_ticket = await db.cursor.fetchone()
         if not deleted_ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
-        db.connection.commit()
+        event_id = deleted_ticket["event_id"]
+        # Tell the reconciler before the ticket leaves the table.
+        returning = await begin_ticket_return(event_id, 1)
+        try:
+            await db.connection.commit()
+        except Exception:
+            if returning:
+                await end_ticket_return(event_id, 1, returned=False)
+            raise
+        if returning:
+            await end_ticket_return(event_id, 1, returned=True)
         return {
             "message": "Ticket deleted successfully",
-            "ticket_id": deleted_ticket[0],
+            "ticket_id": deleted_ticket["ticket_id"],
         }
     except Exception as e:
-        db.connection.rollback()
+        await db.connection.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete ticket: {e}")
+
+
+@ticket.post("/inventory:reconcile", dependencies=[Depends(require_admin)])
+async def reconcile_ticket_inventory(event_id: Optional[uuid.UUID] = None):
+    """Re-sync the Redis seat counters from the tickets table."""
+    try:
+        synced = await reconcile_inventory(event_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to reconcile inventory: {e}"
+        )
+    return {"message": "Inventory reconciled", "events": synced}